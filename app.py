@@ -1,21 +1,64 @@
 # FastAPI
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 
 # Routers
 from routes.auth import router as auth_router
 from routes.user import router as user_router
 from routes.tweet import router as tweet_router
+from routes.metrics import router as metrics_router
+from routes.profiles import router as profiles_router
+
+# Middleware
+from middleware.limiter import ConcurrencyLimitMiddleware
+from middleware.metrics import MetricsMiddleware
+from middleware.diagnostics import QueryDiagnosticsMiddleware
+from middleware.profiler import ProfilerMiddleware
+from middleware.replicas import ReadYourWritesMiddleware
+
+# Settings
+from config.settings import FAST_JSON_RESPONSES
+from config.settings import METRICS_ENABLED
+from config.settings import CONCURRENCY_LIMIT_ENABLED
+from config.settings import PROFILING_ENABLED
+from config.settings import DATABASE_REPLICA_URLS
 
 # Database
-from config.db import meta
-from config.db import engine
+from config.db import wait_for_database
+from config.db import dispose_engines
 
-# Initialize database
-meta.create_all(engine)
+# Utils
+from utils.passwords import shutdown_executor
+from utils.tweet_writes import tweet_writes
 
 # Initialize the app
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse if FAST_JSON_RESPONSES else JSONResponse)
+
+app.add_event_handler('startup', wait_for_database)
+
+app.add_event_handler('shutdown', tweet_writes.close)
+app.add_event_handler('shutdown', dispose_engines)
+app.add_event_handler('shutdown', shutdown_executor)
 
 app.include_router(auth_router, prefix='/auth')
 app.include_router(user_router, prefix='/users')
 app.include_router(tweet_router, prefix='/tweets')
+
+if DATABASE_REPLICA_URLS:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# Inside the metrics, so shed requests are counted
+if CONCURRENCY_LIMIT_ENABLED:
+    app.add_middleware(ConcurrencyLimitMiddleware)
+
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
+
+# Wraps the metrics, tracks the statements of the request for them
+app.add_middleware(QueryDiagnosticsMiddleware)
+
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilerMiddleware)
+    app.include_router(profiles_router, prefix='/debug')
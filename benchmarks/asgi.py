@@ -0,0 +1,171 @@
+"""In-process ASGI client and latency statistics shared by the benchmarks."""
+import json
+import asyncio
+
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from urllib.parse import urlencode
+
+
+class Response:
+    """
+    Response captured from the application.
+    """
+
+    def __init__(self, status_code: int, headers: Dict[str, str], content: bytes):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class ASGIClient:
+    """
+    Minimal HTTP client calling an ASGI application in the current event loop.
+
+    Requests skip the network, so measurements only include the application.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def startup(self) -> None:
+        """
+        Run the application startup handlers.
+        """
+
+        self._lifespan_messages: 'asyncio.Queue[Dict[str, Any]]' = asyncio.Queue()
+        self._lifespan_events: 'asyncio.Queue[Dict[str, Any]]' = asyncio.Queue()
+
+        self._lifespan = asyncio.ensure_future(self.app({'type': 'lifespan', 'asgi': {'version': '3.0'}},
+                                                        self._lifespan_messages.get,
+                                                        self._lifespan_events.put))
+
+        await self._lifespan_step('startup')
+
+    async def shutdown(self) -> None:
+        """
+        Run the application shutdown handlers.
+        """
+
+        await self._lifespan_step('shutdown')
+        await self._lifespan
+
+    async def _lifespan_step(self, event: str) -> None:
+        await self._lifespan_messages.put({'type': f'lifespan.{event}'})
+        message = await self._lifespan_events.get()
+
+        if message['type'] != f'lifespan.{event}.complete':
+            raise RuntimeError(message.get('message', f'Lifespan {event} failed.'))
+
+    async def request(self,
+                      method: str,
+                      path: str,
+                      json_body: Any = None,
+                      headers: Optional[Dict[str, str]] = None,
+                      params: Optional[Dict[str, Any]] = None) -> Response:
+        """
+        Send a request.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The request path.
+            json_body (Any): Body encoded as json.
+            headers (Optional[Dict[str, str]]): Request headers.
+            params (Optional[Dict[str, Any]]): Query parameters.
+
+        Returns:
+            Response: The response.
+        """
+
+        headers = dict(headers or {})
+        body = b''
+
+        if json_body is not None:
+            body = json.dumps(json_body).encode('utf-8')
+            headers['content-type'] = 'application/json'
+
+        query = {key: value for key, value in (params or {}).items() if value is not None}
+
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode('utf-8'),
+            'query_string': urlencode(query).encode('utf-8'),
+            'root_path': '',
+            'headers': [(key.lower().encode('latin-1'), value.encode('latin-1')) for key, value in headers.items()],
+            'client': ('127.0.0.1', 50000),
+            'server': ('testserver', 80),
+        }
+
+        request_sent = False
+        response: Dict[str, Any] = {'status': 500, 'headers': {}, 'body': []}
+
+        async def receive() -> Dict[str, Any]:
+            nonlocal request_sent
+
+            if not request_sent:
+                request_sent = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+
+            # The client never disconnects while a response is being sent.
+            await asyncio.Event().wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message: Dict[str, Any]) -> None:
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+                response['headers'] = {key.decode('latin-1'): value.decode('latin-1')
+                                       for key, value in message.get('headers', [])}
+            elif message['type'] == 'http.response.body':
+                response['body'].append(message.get('body', b''))
+
+        await self.app(scope, receive, send)
+
+        return Response(response['status'], response['headers'], b''.join(response['body']))
+
+
+def percentile(samples: Sequence[float], fraction: float) -> float:
+    """
+    Get a percentile of the samples using the nearest-rank method.
+    """
+
+    if not samples:
+        return 0.0
+
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+
+    return ordered[index]
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, float]:
+    """
+    Summarize request latencies in milliseconds.
+
+    Args:
+        latencies (List[float]): Latency of every request in seconds.
+        elapsed (float): Wall time of the run in seconds.
+        errors (int): Number of unexpected responses.
+
+    Returns:
+        Dict[str, float]: Requests, throughput and p50 / p95 / p99 latencies.
+    """
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+    }
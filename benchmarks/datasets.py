@@ -0,0 +1,105 @@
+"""Seeded datasets for the benchmarks.
+
+Rows are generated from a fixed random seed and written straight through
+the engine, so the same sizes always give the same database.
+"""
+import random
+
+from datetime import datetime
+from datetime import timedelta
+from typing import Dict
+from typing import List
+
+SIZES = {
+    '1k': 1_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+WORDS = [f'word{index}' for index in range(5000)]
+
+CHUNK_SIZE = 10_000
+
+
+def seed(users: int, tweets: int, follows: int = 10, random_seed: int = 42) -> Dict[str, int]:
+    """
+    Fill the configured database with users, tweets and follows.
+
+    Every user gets the password `password`, hashed once with a low bcrypt
+    cost. Tweets are spread over a year and added to their authors'
+    timelines and the search index.
+
+    Args:
+        users (int): Number of users.
+        tweets (int): Number of tweets.
+        follows (int): Users followed by each user.
+        random_seed (int): Seed of the generated content.
+
+    Returns:
+        Dict[str, int]: The dataset sizes.
+    """
+
+    from sqlalchemy import text
+
+    from config.db import engine
+    from config.db import meta
+    from models import User
+    from models import Tweet
+    from models import Follow
+    from utils.passwords import hash_password
+    from utils.search import REINDEX_TWEETS
+
+    meta.create_all(engine)
+
+    generator = random.Random(random_seed)
+    password = hash_password('password', 4)
+    start = datetime(2021, 1, 1)
+
+    with engine.begin() as connection:
+        for first in range(0, users, CHUNK_SIZE):
+            connection.execute(User.insert(), [{
+                'id': index + 1,
+                'first_name': generator.choice(['John', 'Jane', 'Alex', 'Sam']),
+                'last_name': f'Doe{index}',
+                'email': f'user{index + 1}@example.com',
+                'password': password,
+                'birth_date': None,
+                'created_at': start,
+                'updated_at': start,
+            } for index in range(first, min(users, first + CHUNK_SIZE))])
+
+        for first in range(0, tweets, CHUNK_SIZE):
+            connection.execute(Tweet.insert(), [{
+                'id': index + 1,
+                'content': ' '.join(generator.choices(WORDS, k=12)),
+                'user_id': generator.randint(1, users),
+                'created_at': start + timedelta(seconds=index * 31_536_000 // max(tweets, 1)),
+                'updated_at': start,
+            } for index in range(first, min(tweets, first + CHUNK_SIZE))])
+
+        pairs: List[Dict[str, int]] = []
+        for follower in range(1, users + 1):
+            for followee in generator.sample(range(1, users + 1), min(follows, users)):
+                if followee != follower:
+                    pairs.append({'follower_id': follower, 'followee_id': followee, 'created_at': start})
+
+            if len(pairs) >= CHUNK_SIZE:
+                connection.execute(Follow.insert(), pairs)
+                pairs = []
+
+        if pairs:
+            connection.execute(Follow.insert(), pairs)
+
+        # Fan-out on write as done by the API, authors' own entries then followers'
+        connection.execute(text(
+            'INSERT INTO timelines (user_id, tweet_id, author_id, created_at) '
+            'SELECT user_id, id, user_id, created_at FROM tweets'))
+        connection.execute(text(
+            'INSERT INTO timelines (user_id, tweet_id, author_id, created_at) '
+            'SELECT follows.follower_id, tweets.id, tweets.user_id, tweets.created_at '
+            'FROM follows JOIN tweets ON tweets.user_id = follows.followee_id'))
+
+        if engine.dialect.name == 'sqlite':
+            connection.execute(REINDEX_TWEETS)
+
+    return {'users': users, 'tweets': tweets, 'follows_per_user': follows}
@@ -0,0 +1,116 @@
+"""Group commit load test.
+
+Concurrent clients keep creating tweets through `POST /tweets/` for a fixed
+duration, without group commit and then with it for each max delay. Each run
+happens in a fresh process because the settings are read at import time.
+
+Usage:
+    $ python -m benchmarks.group_commit --duration 10 --clients 64 --delays 1,5,20
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+from typing import Any
+from typing import Dict
+from typing import List
+
+
+async def _loop(client: Any, deadline: float, headers: Dict[str, str], latencies: List[float]) -> int:
+    errors = 0
+
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.request('POST', '/tweets/', {'content': 'Group commit'}, headers)
+        latencies.append(time.perf_counter() - started)
+
+        if response.status_code >= 400:
+            errors += 1
+
+    return errors
+
+
+async def measure(args: argparse.Namespace) -> Dict[str, Any]:
+    from app import app
+    from config.db import engine
+    from config.db import meta
+    from benchmarks.asgi import ASGIClient
+    from benchmarks.asgi import summarize
+
+    meta.create_all(engine)
+
+    client = ASGIClient(app)
+    await client.startup()
+
+    response = await client.request('POST', '/auth/signup', {
+        'email': 'writer@example.com',
+        'password': 'password',
+        'first_name': 'Busy',
+        'last_name': 'Writer',
+        'birth_date': '2000-01-01',
+    })
+    headers = {'Authorization': f"Bearer {response.json()['access_token']}"}
+
+    latencies: List[float] = []
+    deadline = time.perf_counter() + args.duration
+    started = time.perf_counter()
+
+    errors = await asyncio.gather(*[_loop(client, deadline, headers, latencies) for _ in range(args.clients)])
+
+    elapsed = time.perf_counter() - started
+    await client.shutdown()
+
+    return summarize(latencies, elapsed, sum(errors))
+
+
+def run(args: argparse.Namespace, environment: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Measure a configuration in a child process.
+    """
+
+    with tempfile.TemporaryDirectory() as directory:
+        environment = {
+            **os.environ,
+            **environment,
+            'DATABASE_URL': f"sqlite:///{os.path.join(directory, 'bench.db')}",
+        }
+        output = subprocess.run([sys.executable, '-m', 'benchmarks.group_commit', '--child',
+                                 '--duration', str(args.duration), '--clients', str(args.clients)],
+                                env=environment, check=True, capture_output=True, text=True).stdout
+
+    return json.loads(output)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--delays', default='1,5,20', help='Comma separated max delays in milliseconds')
+    parser.add_argument('--max-batch', type=int, default=100)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        json.dump(asyncio.run(measure(args)), sys.stdout)
+        return
+
+    results = {'single_commits': run(args, {'TWEETS_GROUP_COMMIT': 'False'})}
+
+    for delay in args.delays.split(','):
+        results[f'group_commit_{delay}ms'] = run(args, {
+            'TWEETS_GROUP_COMMIT': 'True',
+            'TWEETS_GROUP_COMMIT_MAX_DELAY': delay,
+            'TWEETS_GROUP_COMMIT_MAX_BATCH': str(args.max_batch),
+        })
+
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Read latency during a login storm.
+
+Measures the p99 latency of `GET /tweets/` alone and while concurrent clients
+keep logging in, which exercises bcrypt verification.
+
+Usage:
+    $ python -m benchmarks.login_storm --duration 10 --readers 8 --logins 32
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+
+from typing import Any
+from typing import Dict
+from typing import List
+
+
+async def _loop(client: Any, deadline: float, method: str, path: str, body: Any, latencies: List[float]) -> int:
+    errors = 0
+
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.request(method, path, body)
+        latencies.append(time.perf_counter() - started)
+
+        if response.status_code >= 400:
+            errors += 1
+
+    return errors
+
+
+async def measure(client: Any, duration: float, readers: int, logins: int, credentials: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Run `readers` read loops, and `logins` login loops, for `duration` seconds.
+    """
+
+    from benchmarks.asgi import summarize
+
+    reads: List[float] = []
+    logins_latencies: List[float] = []
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+
+    results = await asyncio.gather(
+        *[_loop(client, deadline, 'GET', '/tweets/', None, reads) for _ in range(readers)],
+        *[_loop(client, deadline, 'POST', '/auth/login', credentials, logins_latencies) for _ in range(logins)],
+    )
+
+    elapsed = time.perf_counter() - started
+
+    return {
+        'reads': summarize(reads, elapsed, sum(results[:readers])),
+        'logins': summarize(logins_latencies, elapsed, sum(results[readers:])),
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from app import app
+    from config.db import engine
+    from config.db import meta
+    from benchmarks.asgi import ASGIClient
+
+    meta.create_all(engine)
+
+    client = ASGIClient(app)
+    await client.startup()
+    credentials = {'email': 'storm@example.com', 'password': 'password'}
+
+    response = await client.request('POST', '/auth/signup', {
+        **credentials,
+        'first_name': 'Storm',
+        'last_name': 'Trooper',
+        'birth_date': '2000-01-01',
+    })
+    headers = {'Authorization': f"Bearer {response.json()['access_token']}"}
+
+    for index in range(50):
+        await client.request('POST', '/tweets/', {'content': f'Tweet {index}'}, headers)
+
+    results = {
+        'baseline': await measure(client, args.duration, args.readers, 0, credentials),
+        'login_storm': await measure(client, args.duration, args.readers, args.logins, credentials),
+    }
+
+    await client.shutdown()
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--logins', type=int, default=32)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        json.dump(asyncio.run(run(args)), sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Metrics overhead.
+
+Concurrent clients read tweets and users from a seeded database for a fixed
+duration with the metrics disabled, then enabled, alternating for several
+rounds. Each run happens in a fresh process because the settings are read
+at import time. The overhead is the loss of throughput of the best round
+with the metrics, it should stay within the budget.
+
+Usage:
+    $ python -m benchmarks.metrics_overhead --duration 5 --clients 16 --rounds 3 --budget 3
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+from typing import Any
+from typing import Dict
+from typing import List
+
+USERS = 1000
+TWEETS = 10_000
+
+
+async def _loop(client: Any, deadline: float, generator: random.Random, latencies: List[float]) -> int:
+    errors = 0
+    paths = [
+        lambda: '/tweets/',
+        lambda: f'/tweets/{generator.randint(1, TWEETS)}',
+        lambda: f'/users/users/{generator.randint(1, USERS)}',
+        lambda: f'/users/users/{generator.randint(1, USERS)}/tweets',
+    ]
+
+    while time.perf_counter() < deadline:
+        path = generator.choice(paths)()
+        started = time.perf_counter()
+        response = await client.request('GET', path)
+        latencies.append(time.perf_counter() - started)
+
+        if response.status_code >= 400:
+            errors += 1
+
+    return errors
+
+
+async def measure(args: argparse.Namespace) -> Dict[str, Any]:
+    from app import app
+    from benchmarks.asgi import ASGIClient
+    from benchmarks.asgi import summarize
+
+    client = ASGIClient(app)
+    await client.startup()
+
+    generator = random.Random(args.seed)
+    latencies: List[float] = []
+    deadline = time.perf_counter() + args.duration
+    started = time.perf_counter()
+
+    errors = await asyncio.gather(*[_loop(client, deadline, generator, latencies) for _ in range(args.clients)])
+
+    elapsed = time.perf_counter() - started
+    await client.shutdown()
+
+    return summarize(latencies, elapsed, sum(errors))
+
+
+def run(args: argparse.Namespace, path: str, enabled: bool) -> Dict[str, Any]:
+    """
+    Measure a configuration in a child process.
+    """
+
+    environment = {
+        **os.environ,
+        'DATABASE_URL': f'sqlite:///{path}',
+        'METRICS_ENABLED': str(enabled),
+    }
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.metrics_overhead', '--child',
+                             '--duration', str(args.duration), '--clients', str(args.clients),
+                             '--seed', str(args.seed)],
+                            env=environment, check=True, capture_output=True, text=True).stdout
+
+    return json.loads(output)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--budget', type=float, default=3.0, help='Maximum overhead in percent')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        json.dump(asyncio.run(measure(args)), sys.stdout)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+
+        from benchmarks.datasets import seed
+
+        seed(USERS, TWEETS, random_seed=args.seed)
+
+        rounds: Dict[str, List[Dict[str, Any]]] = {'disabled': [], 'enabled': []}
+
+        for _ in range(args.rounds):
+            rounds['disabled'].append(run(args, path, False))
+            rounds['enabled'].append(run(args, path, True))
+
+    best = {name: max(results, key=lambda result: result['throughput_rps']) for name, results in rounds.items()}
+    overhead = 100 * (1 - best['enabled']['throughput_rps'] / best['disabled']['throughput_rps'])
+
+    json.dump({
+        **best,
+        'overhead_percent': round(overhead, 2),
+        'within_budget': overhead <= args.budget,
+    }, sys.stdout, indent=2)
+    print()
+
+    if overhead > args.budget:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
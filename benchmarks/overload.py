@@ -0,0 +1,178 @@
+"""Overload test of the adaptive concurrency limits.
+
+Measures the capacity of the application with a closed loop of clients,
+then sends an open loop of requests at `--factor` times that rate, without
+and with the limits. Without them every request queues and the p99 grows
+with the backlog until the clients time out, with them the excess gets fast 503s and the p99 of the
+served requests stays near the one at capacity. Each run happens in a
+fresh process because the settings are read at import time.
+
+Usage:
+    $ python -m benchmarks.overload --duration 5 --factor 5
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+USERS = 1000
+TWEETS = 10_000
+
+# Method, path and body of a request
+Request = Tuple[str, str, Any]
+
+
+def _request(generator: random.Random) -> Request:
+    draw = generator.random()
+
+    if draw < 0.7:
+        return 'GET', f'/tweets/{generator.randint(1, TWEETS)}', None
+
+    if draw < 0.9:
+        return 'GET', '/tweets/', None
+
+    return 'POST', '/tweets/', {'content': 'Under load'}
+
+
+async def measure(args: argparse.Namespace) -> Dict[str, Any]:
+    from app import app
+    from benchmarks.asgi import ASGIClient
+    from benchmarks.asgi import summarize
+    from utils.jsonwebtoken import create_access_token
+
+    client = ASGIClient(app)
+    await client.startup()
+
+    # Signed directly, logging in would start the hashing processes that outlive the abandoned run
+    access_token, _ = create_access_token({'sub': 1})
+    headers = {'Authorization': f'Bearer {access_token}'}
+
+    generator = random.Random(args.seed)
+    latencies: List[float] = []
+    counts = {'shed': 0, 'timeouts': 0, 'errors': 0}
+
+    async def send() -> None:
+        method, path, body = _request(generator)
+        started = time.perf_counter()
+
+        try:
+            response = await client.request(method, path, body, headers)
+        except Exception:
+            # Raised after the 500 response, such as pool checkout timeouts
+            counts['errors'] += 1
+            return
+
+        latency = time.perf_counter() - started
+
+        if latency > args.timeout:
+            counts['timeouts'] += 1
+        elif response.status_code == 503:
+            counts['shed'] += 1
+        elif response.status_code >= 400:
+            counts['errors'] += 1
+        else:
+            latencies.append(latency)
+
+    started = time.perf_counter()
+
+    if args.rate:
+        # Open loop, requests are sent at a fixed rate whatever the response times
+        tasks = []
+
+        while time.perf_counter() - started < args.duration:
+            due = int((time.perf_counter() - started) * args.rate) - len(tasks)
+            tasks.extend(asyncio.ensure_future(send()) for _ in range(due))
+            await asyncio.sleep(0.001)
+
+        # Requests still queued when the clients give up are abandoned, the
+        # threadpool calls behind them cannot be cancelled.
+        _, pending = await asyncio.wait(tasks, timeout=args.timeout)
+        counts['timeouts'] += len(pending)
+    else:
+        async def loop() -> None:
+            while time.perf_counter() - started < args.duration:
+                await send()
+
+        await asyncio.gather(*[loop() for _ in range(args.clients)])
+
+    elapsed = time.perf_counter() - started
+
+    from utils.limiter import limits
+
+    return {
+        **summarize(latencies, elapsed, counts['errors']),
+        'shed': counts['shed'],
+        'timeouts': counts['timeouts'],
+        'limits': {group: round(limit.limit, 1) for group, limit in limits.items()},
+    }
+
+
+def run(args: argparse.Namespace, path: str, rate: float, limited: bool) -> Dict[str, Any]:
+    """
+    Measure a configuration in a child process.
+    """
+
+    environment = {
+        **os.environ,
+        'DATABASE_URL': f'sqlite:///{path}',
+        'CONCURRENCY_LIMIT_ENABLED': str(limited),
+    }
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.overload', '--child',
+                             '--duration', str(args.duration), '--clients', str(args.clients),
+                             '--rate', str(rate), '--timeout', str(args.timeout), '--seed', str(args.seed)],
+                            env=environment, check=True, capture_output=True, text=True).stdout
+
+    return json.loads(output)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--clients', type=int, default=8, help='Clients of the capacity run')
+    parser.add_argument('--factor', type=float, default=5.0, help='Overload as a multiple of the capacity')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Seconds before a client gives up')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--rate', type=float, default=0.0, help=argparse.SUPPRESS)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # Not asyncio.run, which would wait for the abandoned requests
+        json.dump(asyncio.new_event_loop().run_until_complete(measure(args)), sys.stdout)
+        sys.stdout.flush()
+        os._exit(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+
+        from benchmarks.datasets import seed
+
+        seed(USERS, TWEETS, random_seed=args.seed)
+
+        capacity = run(args, path, 0.0, False)
+        rate = capacity['throughput_rps'] * args.factor
+
+        results = {
+            'capacity': capacity,
+            'rate_rps': round(rate, 2),
+            'overload_unlimited': run(args, path, rate, False),
+            'overload_limited': run(args, path, rate, True),
+        }
+
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Connection pool scaling with the number of threads.
+
+Threads check out a connection from the pool, read a random tweet with its
+author and return the connection, like a request does, for a fixed duration.
+Each thread count runs with a pool as large as the number of threads, then
+with a single connection shared by all the threads (the global connection
+the pool replaced), in a fresh process since the pool size is read at import
+time. Reports throughput and latencies per pool size.
+
+Usage:
+    $ python -m benchmarks.pool_scaling --threads 1,2,4,8,16 --duration 5
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+
+from typing import Any
+from typing import Dict
+from typing import List
+
+USERS = 1000
+TWEETS = 10_000
+
+
+def _loop(engine: Any, statement: Any, deadline: float, seed: int, latencies: List[float], errors: List[int]) -> None:
+    generator = random.Random(seed)
+
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+
+        try:
+            with engine.connect() as connection:
+                connection.execute(statement, {'id': generator.randint(1, TWEETS)}).first()
+        except Exception:
+            errors.append(1)
+
+        latencies.append(time.perf_counter() - started)
+
+
+def measure(args: argparse.Namespace) -> Dict[str, Any]:
+    from config.db import engine
+    from routes.tweet import RETRIEVE_TWEET
+    from benchmarks.asgi import summarize
+
+    latencies: List[float] = []
+    errors: List[int] = []
+    deadline = time.perf_counter() + args.duration
+    started = time.perf_counter()
+
+    threads = [threading.Thread(target=_loop,
+                                args=(engine, RETRIEVE_TWEET, deadline, args.seed + index, latencies, errors))
+               for index in range(args.child_threads)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    return summarize(latencies, time.perf_counter() - started, len(errors))
+
+
+def run(args: argparse.Namespace, path: str, threads: int, pool_size: int) -> Dict[str, Any]:
+    """
+    Measure a configuration in a child process.
+    """
+
+    environment = {
+        **os.environ,
+        'DATABASE_URL': f'sqlite:///{path}',
+        'DATABASE_POOL_SIZE': str(pool_size),
+        'DATABASE_POOL_MAX_OVERFLOW': '0',
+    }
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.pool_scaling', '--child',
+                             '--child-threads', str(threads), '--duration', str(args.duration),
+                             '--seed', str(args.seed)],
+                            env=environment, check=True, capture_output=True, text=True).stdout
+
+    return {'pool_size': pool_size, **json.loads(output)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', default='1,2,4,8,16', help='Comma separated thread counts')
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--child-threads', type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        json.dump(measure(args), sys.stdout)
+        return
+
+    results: Dict[str, Dict[str, Any]] = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+
+        from benchmarks.datasets import seed
+
+        seed(USERS, TWEETS, random_seed=args.seed)
+
+        for threads in [int(value) for value in args.threads.split(',')]:
+            results[str(threads)] = {
+                'pooled': run(args, path, threads, threads),
+                'single_connection': run(args, path, threads, 1),
+            }
+
+    json.dump({'threads': results}, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Row mapping micro-benchmark.
+
+Compares the rows/sec of the tweets-users join mapped with `pydottie.transform`
+over a raw `text()` query with dotted aliases against the compiled
+`TWEETS_WITH_USER` select mapped by column position.
+
+Usage:
+    $ python -m benchmarks.row_mapping --rows 10000 100000
+"""
+import os
+import argparse
+import time
+
+from datetime import datetime
+from typing import Callable
+from typing import Dict
+from typing import List
+
+# Use a private in-memory database
+os.environ['DATABASE_URL'] = 'sqlite://'
+
+# PyDottie
+import pydottie  # type: ignore
+
+# SQLAlchemy
+from sqlalchemy import text
+
+# Database
+from config.db import engine
+from config.db import meta
+
+# Models
+from models import Tweet
+from models import User
+
+# Utils
+from utils.tweets import TWEETS_WITH_USER
+from utils.tweets import tweet_with_user
+
+
+DOTTED_QUERY = text("""
+SELECT
+    t.id as 'id',
+    t.content as 'content',
+    t.created_at as 'created_at',
+    t.updated_at as 'updated_at',
+    u.id as 'user.id',
+    u.first_name as 'user.first_name',
+    u.last_name as 'user.last_name',
+    u.birth_date as 'user.birth_date',
+    u.email as 'user.email',
+    u.created_at as 'user.created_at',
+    u.updated_at as 'user.updated_at'
+FROM
+    tweets as t
+INNER JOIN
+    users as u
+ON
+    t.user_id = u.id
+""")
+
+
+def seed(rows: int) -> None:
+    """
+    Recreate the tables with `rows` tweets spread over 100 users.
+    """
+
+    meta.drop_all(engine)
+    meta.create_all(engine)
+
+    now = datetime.utcnow()
+
+    with engine.begin() as connection:
+        connection.execute(User.insert(), [{
+            'id': index + 1,
+            'first_name': 'John',
+            'last_name': f'Doe {index}',
+            'email': f'user{index}@example.com',
+            'password': 'not-a-hash',
+            'created_at': now,
+            'updated_at': now,
+        } for index in range(100)])
+
+        connection.execute(Tweet.insert(), [{
+            'content': f'Tweet number {index}',
+            'user_id': index % 100 + 1,
+            'created_at': now,
+            'updated_at': now,
+        } for index in range(rows)])
+
+
+def run(statement, mapper: Callable) -> Dict[str, float]:
+    """
+    Time fetching the whole join and mapping every row.
+
+    Returns:
+        Dict[str, float]: Total and mapping-only rows/sec.
+    """
+
+    with engine.connect() as connection:
+        started = time.perf_counter()
+        rows = connection.execute(statement).fetchall()
+        fetched = time.perf_counter()
+        output: List = [mapper(row) for row in rows]
+        mapped = time.perf_counter()
+
+    return {
+        'rows_per_sec': len(output) / (mapped - started),
+        'mapping_rows_per_sec': len(output) / (mapped - fetched),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    paths = {
+        'pydottie': (DOTTED_QUERY, lambda row: pydottie.transform(row._mapping)),
+        'compiled': (TWEETS_WITH_USER, tweet_with_user),
+    }
+
+    for rows in args.rows:
+        seed(rows)
+
+        for name, (statement, mapper) in paths.items():
+            best = max((run(statement, mapper) for _ in range(args.repeat)),
+                       key=lambda result: result['rows_per_sec'])
+
+            print(f"{rows:>9} rows  {name:<9} "
+                  f"{best['rows_per_sec']:>12,.0f} rows/s total  "
+                  f"{best['mapping_rows_per_sec']:>12,.0f} rows/s mapping")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Full-text search benchmark.
+
+Seeds SQLite with random tweets, builds the FTS5 index and compares the ranked
+index search used by `GET /tweets/search` against a `LIKE '%term%'` scan.
+
+Usage:
+    $ python -m benchmarks.search --tweets 1000000
+"""
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+
+from datetime import datetime
+from typing import Dict
+from typing import List
+
+
+WORDS = [f'word{index}' for index in range(5000)]
+
+
+def seed(tweets: int, batch: int = 50_000) -> None:
+    from config.db import engine
+    from config.db import meta
+    from models import Tweet
+    from models import User
+    from utils.search import REINDEX_TWEETS
+
+    meta.create_all(engine)
+    now = datetime.utcnow()
+
+    with engine.begin() as connection:
+        connection.execute(User.insert(), [{
+            'id': index + 1,
+            'first_name': 'John',
+            'last_name': 'Doe',
+            'email': f'user{index}@example.com',
+            'password': 'not-a-hash',
+            'created_at': now,
+            'updated_at': now,
+        } for index in range(1000)])
+
+        for start in range(0, tweets, batch):
+            connection.execute(Tweet.insert(), [{
+                'content': ' '.join(random.choices(WORDS, k=12)),
+                'user_id': index % 1000 + 1,
+                'created_at': now,
+                'updated_at': now,
+            } for index in range(start, min(tweets, start + batch))])
+
+        connection.execute(REINDEX_TWEETS)
+
+
+def timed(statement, parameters: Dict, repeat: int) -> float:
+    from config.db import engine
+
+    with engine.connect() as connection:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            connection.execute(statement, parameters).fetchall()
+
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tweets', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+
+        from models import Tweet
+        from utils.search import SEARCH_STATEMENTS
+        from utils.search import _sqlite_query
+        from utils.tweets import TWEETS_WITH_USER
+        from utils.tweets import NEWEST_FIRST
+
+        started = time.perf_counter()
+        seed(args.tweets)
+        seeded = time.perf_counter() - started
+
+        terms = random.sample(WORDS, args.queries)
+        indexed: List[float] = []
+        scanned: List[float] = []
+
+        for term in terms:
+            indexed.append(timed(SEARCH_STATEMENTS['sqlite'].limit(args.limit),
+                                 {'query': _sqlite_query(term)}, 3))
+            scanned.append(timed(TWEETS_WITH_USER.where(Tweet.c.content.contains(term))
+                                 .order_by(*NEWEST_FIRST).limit(args.limit), {}, 1))
+
+        print(json.dumps({
+            'tweets': args.tweets,
+            'seed_seconds': round(seeded, 2),
+            'fts_ms_avg': round(sum(indexed) / len(indexed), 3),
+            'fts_ms_max': round(max(indexed), 3),
+            'like_scan_ms_avg': round(sum(scanned) / len(scanned), 3),
+            'like_scan_ms_max': round(max(scanned), 3),
+        }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
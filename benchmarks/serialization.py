@@ -0,0 +1,96 @@
+"""Serialization cost of a page of tweets.
+
+Compares the default FastAPI path of `GET /tweets/` (validation against
+`TweetPage`, `jsonable_encoder` and `json.dumps`) with the FAST_JSON_RESPONSES
+path (orjson on the dicts built by the endpoint), per 1k tweets.
+
+Usage:
+    $ python -m benchmarks.serialization --tweets 1000 --repeat 50
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+
+from datetime import date
+from datetime import datetime
+from typing import Any
+from typing import Callable
+from typing import Dict
+
+# Settings require a database url even though no query is made
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from schemas.tweet import TweetPage
+
+
+def page(tweets: int) -> Dict[str, Any]:
+    now = datetime.utcnow()
+
+    return {
+        'items': [{
+            'id': index,
+            'content': f'Tweet number {index} with some words in it',
+            'created_at': now,
+            'updated_at': now,
+            'user': {
+                'id': index % 100,
+                'first_name': 'John',
+                'last_name': 'Doe',
+                'email': f'user{index % 100}@example.com',
+                'birth_date': date(2000, 1, 1),
+                'created_at': now,
+                'updated_at': now,
+            },
+        } for index in range(tweets)],
+        'next_cursor': 'WyIyMDIxLTExLTAxVDAwOjAwOjAwIiwxXQ==',
+    }
+
+
+def timed(function: Callable[[], Any], repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+
+    return (time.perf_counter() - started) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tweets', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    content = page(args.tweets)
+    field = create_response_field(name='Response_list_tweets', type_=TweetPage)
+
+    loop = asyncio.new_event_loop()
+
+    def default() -> bytes:
+        body = loop.run_until_complete(serialize_response(field=field, response_content=content))
+        return JSONResponse(body).body
+
+    def fast() -> bytes:
+        return ORJSONResponse(content).body
+
+    assert json.loads(default()) == json.loads(fast())
+
+    results = {}
+    for name, function in (('default', default), ('fast_json', fast)):
+        elapsed = timed(function, args.repeat)
+        results[name] = {'ms_per_1k_tweets': round(elapsed / args.tweets * 1000 * 1000, 3)}
+
+    loop.close()
+    results['speedup'] = round(results['default']['ms_per_1k_tweets'] / results['fast_json']['ms_per_1k_tweets'], 1)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
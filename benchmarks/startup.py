@@ -0,0 +1,119 @@
+"""Cold start time.
+
+Starts fresh processes that import the application, run its startup
+handlers and serve a first request, and reports the median time of each
+step. The run fails when the median total, from process start to the first
+response, is over the budget.
+
+Usage:
+    $ python -m benchmarks.startup --runs 5 --budget 2000
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+from typing import Any
+from typing import Dict
+from typing import List
+
+STEPS = ('import_ms', 'startup_ms', 'first_request_ms', 'total_ms')
+
+
+async def _serve_first_request() -> Dict[str, float]:
+    from benchmarks.asgi import ASGIClient
+
+    imported = time.perf_counter()
+
+    from app import app
+
+    client = ASGIClient(app)
+    ready = time.perf_counter()
+    await client.startup()
+    started_up = time.perf_counter()
+
+    response = await client.request('GET', '/tweets/')
+    responded = time.perf_counter()
+
+    if response.status_code != 200:
+        raise RuntimeError(f'First request failed with {response.status_code}.')
+
+    await client.shutdown()
+
+    return {
+        'import_ms': (ready - imported) * 1000,
+        'startup_ms': (started_up - ready) * 1000,
+        'first_request_ms': (responded - started_up) * 1000,
+    }
+
+
+def measure_startup(database_url: str, runs: int = 5) -> Dict[str, Any]:
+    """
+    Measure the cold start of the application in fresh processes.
+
+    The database must already have its schema.
+
+    Args:
+        database_url (str): The database the application connects to.
+        runs (int): Number of processes started.
+
+    Returns:
+        Dict[str, Any]: Median milliseconds of each step.
+    """
+
+    samples: List[Dict[str, float]] = []
+
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, '-m', 'benchmarks.startup', '--child'],
+                                env={**os.environ, 'DATABASE_URL': database_url},
+                                check=True, capture_output=True, text=True).stdout
+        sample = json.loads(output)
+        # Interpreter start and the end of the process included
+        sample['total_ms'] = (time.perf_counter() - started) * 1000
+        samples.append(sample)
+
+    return {
+        'runs': runs,
+        **{step: round(statistics.median(sample[step] for sample in samples), 1) for step in STEPS},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=2000.0, help='Maximum median total in milliseconds')
+    parser.add_argument('--database', help='Database url with a schema, a temporary SQLite file by default')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        json.dump(asyncio.run(_serve_first_request()), sys.stdout)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = args.database or f"sqlite:///{os.path.join(directory, 'bench.db')}"
+
+        if not args.database:
+            subprocess.run([sys.executable, 'manage.py', 'migrate'],
+                           env={**os.environ, 'DATABASE_URL': database_url}, check=True)
+
+        report = measure_startup(database_url, args.runs)
+
+    report['budget_ms'] = args.budget
+    report['within_budget'] = report['total_ms'] <= args.budget
+
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+    if not report['within_budget']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
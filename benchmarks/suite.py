@@ -0,0 +1,309 @@
+"""Route benchmark suite.
+
+Seeds a SQLite database, boots `app.app` in process and drives every route
+of the auth, users and tweets routers, reporting throughput and p50 / p95 /
+p99 latencies per route as JSON. The cold start of the application is
+measured first, the suite fails when it is over `--startup-budget`.
+
+Usage:
+    $ python -m benchmarks.suite --size 100k --users 10000 --requests 200 --concurrency 8
+    $ python -m benchmarks.suite --size 1m --database /tmp/bench-1m.db  # seeded once, then reused
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+
+# A scenario builds the i-th request: method, path, json body, headers, query parameters
+Request = Tuple[str, str, Any, Optional[Dict[str, str]], Optional[Dict[str, Any]]]
+
+
+class Scenario:
+    """
+    Requests sent to a single route and the statuses expected from it.
+    """
+
+    def __init__(self,
+                 name: str,
+                 build: Callable[[int], Request],
+                 expected: Tuple[int, ...] = (200,),
+                 share: float = 1.0,
+                 concurrent: bool = True):
+        """
+        Args:
+            name (str): Reported name of the route.
+            build (Callable[[int], Request]): Builds the request of an index.
+            expected (Tuple[int, ...]): Statuses that are not errors.
+            share (float): Fraction of `--requests` sent, for the slow routes.
+            concurrent (bool): False for requests that depend on the previous ones.
+        """
+
+        self.name = name
+        self.build = build
+        self.expected = expected
+        self.share = share
+        self.concurrent = concurrent
+
+
+async def run_scenario(client: Any, scenario: Scenario, requests: int, concurrency: int) -> Dict[str, Any]:
+    """
+    Send the requests of a scenario from `concurrency` workers.
+    """
+
+    from benchmarks.asgi import summarize
+
+    total = max(1, int(requests * scenario.share))
+    indexes = iter(range(total))
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+
+        for index in indexes:
+            method, path, body, headers, params = scenario.build(index)
+            started = time.perf_counter()
+            response = await client.request(method, path, body, headers, params)
+            latencies.append(time.perf_counter() - started)
+
+            if response.status_code not in scenario.expected:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency if scenario.concurrent else 1)])
+
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def prepare(client: Any, users: int, generator: random.Random) -> Dict[str, Any]:
+    """
+    Log in as a seeded user and collect what the scenarios reuse.
+    """
+
+    response = await client.request('POST', '/auth/login', {'email': 'user1@example.com', 'password': 'password'})
+    credentials = response.json()
+    headers = {'Authorization': f"Bearer {credentials['access_token']}"}
+
+    first_page = (await client.request('GET', '/tweets/')).json()
+    tweet_id = first_page['items'][0]['id']
+
+    return {
+        'headers': headers,
+        'refresh_token': credentials['refresh_token'],
+        'cursor': first_page['next_cursor'],
+        'tweet_id': tweet_id,
+        'tweet_etag': (await client.request('GET', f'/tweets/{tweet_id}')).headers.get('etag', ''),
+        'user_etag': (await client.request('GET', '/users/users/1')).headers.get('etag', ''),
+        'since': first_page['items'][-1]['created_at'],
+        'random_user': lambda: generator.randint(2, users),
+        'signups': [],
+        'created': [],
+    }
+
+
+def scenarios(state: Dict[str, Any], generator: random.Random, run_id: str) -> List[Scenario]:
+    """
+    Scenarios of every route, in an order where each one finds the data it needs.
+    """
+
+    from benchmarks.datasets import WORDS
+
+    headers = state['headers']
+    random_user = state['random_user']
+
+    def signup(index: int) -> Request:
+        return ('POST', '/auth/signup', {
+            'email': f'signup-{run_id}-{index}@example.com',
+            'password': 'password',
+            'first_name': 'Bench',
+            'last_name': 'Mark',
+            'birth_date': '2000-01-01',
+        }, None, None)
+
+    def signed_up(index: int) -> Dict[str, Any]:
+        return state['signups'][index % len(state['signups'])]
+
+    def created(index: int) -> int:
+        return state['created'][index % len(state['created'])]
+
+    return [
+        Scenario('POST /auth/signup', signup, (201,), share=0.1),
+        Scenario('POST /auth/login', lambda index: ('POST', '/auth/login', {
+            'email': signed_up(index)['user']['email'], 'password': 'password'}, None, None), share=0.1),
+        Scenario('POST /auth/refresh', lambda index: ('POST', '/auth/refresh', {
+            'refresh_token': state['refresh_token']}, None, None)),
+
+        Scenario('GET /users/users/', lambda index: ('GET', '/users/users/', None, None, None)),
+        Scenario('GET /users/users/?name=', lambda index: ('GET', '/users/users/', None, None, {'name': 'Ja'})),
+        Scenario('GET /users/users/{id}', lambda index: ('GET', f'/users/users/{random_user()}', None, None, None)),
+        Scenario('GET /users/users/{id} 304', lambda index: ('GET', '/users/users/1', None, {
+            'If-None-Match': state['user_etag']}, None), (304,)),
+        Scenario('GET /users/users/{id}/tweets', lambda index: (
+            'GET', f'/users/users/{random_user()}/tweets', None, None, None)),
+        Scenario('PUT /users/users/{id}', lambda index: ('PUT', f"/users/users/{signed_up(index)['user']['id']}", {
+            'email': signed_up(index)['user']['email'],
+            'password': 'password',
+            'first_name': 'Bench',
+            'last_name': f'Updated{index}',
+        }, {'Authorization': f"Bearer {signed_up(index)['access_token']}"}, None), share=0.1),
+        Scenario('POST /users/users/{id}/follow', lambda index: (
+            'POST', f'/users/users/{random_user()}/follow', None, headers, None), (204,)),
+        Scenario('DELETE /users/users/{id}/follow', lambda index: (
+            'DELETE', f'/users/users/{random_user()}/follow', None, headers, None), (204,)),
+
+        Scenario('GET /tweets/', lambda index: ('GET', '/tweets/', None, None, None)),
+        Scenario('GET /tweets/?cursor=', lambda index: ('GET', '/tweets/', None, None, {'cursor': state['cursor']})),
+        Scenario('GET /tweets/timeline', lambda index: ('GET', '/tweets/timeline', None, headers, None)),
+        Scenario('GET /tweets/search', lambda index: ('GET', '/tweets/search', None, None, {
+            'q': generator.choice(WORDS)})),
+        Scenario('GET /tweets/{id}', lambda index: (
+            'GET', f'/tweets/{generator.randint(1, state["tweet_id"])}', None, None, None)),
+        Scenario('GET /tweets/{id} 304', lambda index: ('GET', f'/tweets/{state["tweet_id"]}', None, {
+            'If-None-Match': state['tweet_etag']}, None), (304,)),
+        Scenario('GET /tweets/export?since=', lambda index: ('GET', '/tweets/export', None, None, {
+            'since': state['since']}), share=0.1),
+        Scenario('POST /tweets/', lambda index: ('POST', '/tweets/', {
+            'content': f'Benchmark tweet {index}'}, headers, None)),
+        Scenario('POST /tweets/batch', lambda index: ('POST', '/tweets/batch', {
+            'items': [{'content': f'Benchmark batch {index} tweet {item}'} for item in range(20)]}, headers, None),
+            share=0.1),
+        Scenario('PUT /tweets/{id}', lambda index: ('PUT', f'/tweets/{created(index)}', {
+            'content': f'Edited {index}'}, headers, None)),
+        Scenario('DELETE /tweets/{id}', lambda index: (
+            'DELETE', f'/tweets/{created(index)}', None, headers, None), (204,), concurrent=False),
+        Scenario('DELETE /users/users/{id}', lambda index: (
+            'DELETE', f"/users/users/{signed_up(index)['user']['id']}", None,
+            {'Authorization': f"Bearer {signed_up(index)['access_token']}"}, None), (204,), share=0.1,
+            concurrent=False),
+    ]
+
+
+class RecordingClient:
+    """
+    Client keeping the users and tweets created by the scenarios for the next ones.
+    """
+
+    def __init__(self, client: Any, state: Dict[str, Any]):
+        self.client = client
+        self.state = state
+
+    async def request(self, method: str, path: str, *args: Any) -> Any:
+        response = await self.client.request(method, path, *args)
+
+        if method == 'POST' and response.status_code < 300:
+            if path == '/auth/signup':
+                self.state['signups'].append(response.json())
+            elif path == '/tweets/':
+                self.state['created'].append(response.json()['id'])
+
+        return response
+
+
+async def run(args: argparse.Namespace, users: int) -> Dict[str, Any]:
+    from app import app
+    from benchmarks.asgi import ASGIClient
+
+    generator = random.Random(args.seed)
+    client = ASGIClient(app)
+    await client.startup()
+
+    state = await prepare(client, users, generator)
+    recording = RecordingClient(client, state)
+    results = {}
+
+    for scenario in scenarios(state, generator, str(int(time.time()))):
+        results[scenario.name] = await run_scenario(recording, scenario, args.requests, args.concurrency)
+
+    await client.shutdown()
+
+    return results
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    from benchmarks.datasets import SIZES
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', choices=sorted(SIZES), default='1k', help='Number of seeded tweets')
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--requests', type=int, default=200, help='Requests per route')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database', help='SQLite file, seeded if missing and reused otherwise')
+    parser.add_argument('--output', help='Write the report to a file instead of stdout')
+    parser.add_argument('--startup-runs', type=int, default=3, help='Cold starts measured')
+    parser.add_argument('--startup-budget', type=float, default=2000.0,
+                        help='Maximum median milliseconds from process start to the first response')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.database or os.path.join(directory, 'bench.db')
+        reuse = os.path.exists(path)
+        os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(path)}'
+
+        from benchmarks.datasets import seed
+
+        started = time.perf_counter()
+        dataset = {'users': args.users, 'tweets': SIZES[args.size], 'reused': reuse}
+
+        if not reuse:
+            dataset.update(seed(args.users, SIZES[args.size], random_seed=args.seed))
+
+        dataset['seed_seconds'] = round(time.perf_counter() - started, 2)
+
+        from config import settings
+        from benchmarks.startup import measure_startup
+
+        startup = measure_startup(os.environ['DATABASE_URL'], args.startup_runs)
+        startup['budget_ms'] = args.startup_budget
+        startup['within_budget'] = startup['total_ms'] <= args.startup_budget
+
+        report = {
+            'meta': {
+                'commit': _commit(),
+                'python': platform.python_version(),
+                'database': 'sqlite',
+                'database_async': settings.DATABASE_ASYNC,
+                'fast_json_responses': settings.FAST_JSON_RESPONSES,
+                'requests': args.requests,
+                'concurrency': args.concurrency,
+                'dataset': dataset,
+            },
+            'startup': startup,
+            'routes': asyncio.run(run(args, args.users)),
+        }
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if not startup['within_budget']:
+        sys.exit(f"Cold start of {startup['total_ms']} ms is over the {args.startup_budget} ms budget.")
+
+
+if __name__ == '__main__':
+    main()
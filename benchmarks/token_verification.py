@@ -0,0 +1,49 @@
+"""Access token verification benchmark.
+
+Compares `verify_token` against `verify_token_cached` for a mix of requests
+where each client reuses its access token for a whole session.
+
+Usage:
+    $ python -m benchmarks.token_verification --clients 1000 --requests 100000
+"""
+import os
+import json
+import time
+import random
+import argparse
+
+# Settings require a database url even though no query is made
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from utils.jsonwebtoken import create_access_token
+from utils.jsonwebtoken import verify_token
+from utils.jsonwebtoken import verify_token_cached
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=100_000)
+    args = parser.parse_args()
+
+    tokens = [create_access_token({'sub': index, 'email': f'user{index}@example.com', 'name': 'John Doe'})[0]
+              for index in range(args.clients)]
+    mix = [random.choice(tokens) for _ in range(args.requests)]
+
+    results = {}
+    for name, verify in (('verify_token', verify_token), ('verify_token_cached', verify_token_cached)):
+        started = time.perf_counter()
+        for token in mix:
+            verify(token)
+        elapsed = time.perf_counter() - started
+
+        results[name] = {
+            'verifications_per_sec': round(len(mix) / elapsed),
+            'us_per_verification': round(elapsed / len(mix) * 1_000_000, 2),
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Bulk tweet creation throughput.
+
+Creates the same number of tweets with single `POST /tweets/` requests and
+with `POST /tweets/batch` requests, and compares the tweets per second.
+
+Usage:
+    $ python -m benchmarks.tweet_batch --tweets 2000 --batch-size 100
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+
+from typing import Any
+from typing import Dict
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from app import app
+    from config.db import engine
+    from config.db import meta
+    from benchmarks.asgi import ASGIClient
+
+    meta.create_all(engine)
+
+    client = ASGIClient(app)
+    await client.startup()
+
+    response = await client.request('POST', '/auth/signup', {
+        'email': 'bot@example.com',
+        'password': 'password',
+        'first_name': 'Bulk',
+        'last_name': 'Poster',
+        'birth_date': '2000-01-01',
+    })
+    headers = {'Authorization': f"Bearer {response.json()['access_token']}"}
+
+    started = time.perf_counter()
+    for index in range(args.tweets):
+        await client.request('POST', '/tweets/', {'content': f'Single {index}'}, headers)
+    single = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for start in range(0, args.tweets, args.batch_size):
+        items = [{'content': f'Batch {index}'} for index in range(start, min(args.tweets, start + args.batch_size))]
+        await client.request('POST', '/tweets/batch', {'items': items}, headers)
+    batch = time.perf_counter() - started
+
+    await client.shutdown()
+
+    return {
+        'tweets': args.tweets,
+        'batch_size': args.batch_size,
+        'single_tweets_per_second': round(args.tweets / single, 1),
+        'batch_tweets_per_second': round(args.tweets / batch, 1),
+        'speedup': round(single / batch, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tweets', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        json.dump(asyncio.run(run(args)), sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""Throughput scaling with the number of worker processes.
+
+Serves a seeded SQLite database with `main.py` in multi-process mode for
+each worker count and loads it over HTTP with keep-alive connections,
+reporting throughput and latencies per worker count. The load is generated
+by a single process, give it a core of its own for meaningful numbers.
+
+Usage:
+    $ python -m benchmarks.workers --workers 1,2,4 --connections 64 --duration 10
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+USERS = 1000
+TWEETS = 10_000
+
+
+async def _get(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, path: str) -> int:
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+    await writer.drain()
+
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    length = 0
+
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+
+        if name.lower() == 'content-length':
+            length = int(value)
+
+    await reader.readexactly(length)
+
+    return int(lines[0].split()[1])
+
+
+async def _connection(port: int, deadline: float, generator: random.Random,
+                      latencies: List[float], errors: List[int]) -> None:
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+
+    while time.perf_counter() < deadline:
+        path = generator.choice(['/tweets/', f'/tweets/{generator.randint(1, TWEETS)}'])
+        started = time.perf_counter()
+
+        try:
+            status = await _get(reader, writer, path)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            # The worker was replaced after its max requests, reconnect
+            writer.close()
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            continue
+
+        latencies.append(time.perf_counter() - started)
+
+        if status >= 400:
+            errors.append(status)
+
+    writer.close()
+
+
+async def load(port: int, connections: int, duration: float, seed: int) -> Dict[str, float]:
+    """
+    Send requests over keep-alive connections for a fixed duration.
+    """
+
+    from benchmarks.asgi import summarize
+
+    generator = random.Random(seed)
+    latencies: List[float] = []
+    errors: List[int] = []
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+
+    await asyncio.gather(*[_connection(port, deadline, generator, latencies, errors) for _ in range(connections)])
+
+    return summarize(latencies, time.perf_counter() - started, len(errors))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_ready(port: int, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+
+    raise RuntimeError(f'The server did not listen on port {port} within {timeout}s.')
+
+
+def serve(database_url: str, workers: int) -> Tuple[subprocess.Popen, int]:
+    """
+    Start `main.py` in multi-process mode.
+    """
+
+    port = _free_port()
+    server = subprocess.Popen([sys.executable, 'main.py'], env={
+        **os.environ,
+        'DATABASE_URL': database_url,
+        'DEBUG': 'False',
+        'PORT': str(port),
+        'SERVER_MULTIPROCESS': 'True',
+        'SERVER_WORKERS': str(workers),
+    }, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    try:
+        _wait_until_ready(port)
+    except RuntimeError:
+        server.terminate()
+        raise
+
+    return server, port
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4', help='Comma separated worker counts')
+    parser.add_argument('--connections', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--warmup', type=float, default=2.0, help='Seconds of load before measuring')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, float]] = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        os.environ['DATABASE_URL'] = database_url
+
+        from benchmarks.datasets import seed
+
+        seed(USERS, TWEETS, random_seed=args.seed)
+
+        for workers in [int(count) for count in args.workers.split(',')]:
+            server, port = serve(database_url, workers)
+
+            try:
+                asyncio.run(load(port, args.connections, args.warmup, args.seed))
+                results[str(workers)] = asyncio.run(load(port, args.connections, args.duration, args.seed))
+            finally:
+                server.terminate()
+                server.wait()
+
+    baseline = next(iter(results.values()))['throughput_rps']
+
+    for result in results.values():
+        result['speedup'] = round(result['throughput_rps'] / baseline, 2) if baseline else 0.0
+
+    json.dump({'cpu_count': os.cpu_count(), 'workers': results}, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,610 @@
+import time
+import asyncio
+import logging
+
+from contextlib import asynccontextmanager
+from typing import Any
+from typing import AsyncIterator
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+# Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
 # SQLAlchemy
 from sqlalchemy import create_engine   # type: ignore
+from sqlalchemy import event  # type: ignore
 from sqlalchemy import MetaData  # type: ignore
+from sqlalchemy import text  # type: ignore
+from sqlalchemy.engine import Connection  # type: ignore
+from sqlalchemy.engine import Engine  # type: ignore
+from sqlalchemy.engine import Result  # type: ignore
+from sqlalchemy.engine import Row  # type: ignore
+from sqlalchemy.engine import make_url  # type: ignore
+from sqlalchemy.engine.url import URL  # type: ignore
+from sqlalchemy.exc import DBAPIError  # type: ignore
+from sqlalchemy.ext.asyncio import AsyncConnection  # type: ignore
+from sqlalchemy.ext.asyncio import AsyncEngine  # type: ignore
+from sqlalchemy.ext.asyncio import create_async_engine  # type: ignore
+from sqlalchemy.pool import AsyncAdaptedQueuePool  # type: ignore
+from sqlalchemy.pool import QueuePool  # type: ignore
+from sqlalchemy.pool import StaticPool  # type: ignore
 
 # Local
 from config.settings import DATABASE_URL
+from config.settings import DATABASE_ASYNC
+from config.settings import DATABASE_ASYNC_URL
+from config.settings import DATABASE_POOL_SIZE
+from config.settings import DATABASE_POOL_MAX_OVERFLOW
+from config.settings import DATABASE_POOL_TIMEOUT
+from config.settings import DATABASE_POOL_PRE_PING
+from config.settings import DATABASE_POOL_RECYCLE
+from config.settings import DATABASE_CONNECT_ATTEMPTS
+from config.settings import DATABASE_CONNECT_BACKOFF
+from config.settings import DATABASE_CONNECT_MAX_BACKOFF
+from config.settings import DATABASE_REPLICA_URLS
+from config.settings import DATABASE_REPLICA_RETRY_AFTER
+from config.settings import DATABASE_READ_YOUR_WRITES
+from config.settings import METRICS_ENABLED
+
+# Utils
+from utils.cache import TTLCache
+from utils.jsonwebtoken import bearer_principal
+from utils.metrics import Gauge
+from utils.metrics import register
+from utils.diagnostics import record_query
+
+
+logger = logging.getLogger(__name__)
+
+ASYNC_DRIVERS = {
+    'mysql': 'aiomysql',
+    'sqlite': 'aiosqlite',
+}
+
+
+def _engine_options(url: URL, poolclass: type) -> Dict[str, Any]:
+    """
+    Build the engine options for a database url.
+
+    Args:
+        url (URL): The database url.
+        poolclass (type): The pool class to use for server databases.
+
+    Returns:
+        Dict[str, Any]: The keyword arguments for `create_engine`.
+    """
+
+    options: Dict[str, Any] = {
+        'future': True,
+        'pool_pre_ping': DATABASE_POOL_PRE_PING,
+    }
+
+    if url.get_backend_name() == 'sqlite':
+        # Connections are checked out and returned from different threadpool workers.
+        options['connect_args'] = {'check_same_thread': False}
+
+        # Every connection to an in-memory database is a new database, so share one.
+        if url.database in (None, '', ':memory:'):
+            options['poolclass'] = StaticPool
+            return options
+
+    options.update({
+        'poolclass': poolclass,
+        'pool_size': DATABASE_POOL_SIZE,
+        'max_overflow': DATABASE_POOL_MAX_OVERFLOW,
+        'pool_timeout': DATABASE_POOL_TIMEOUT,
+        'pool_recycle': DATABASE_POOL_RECYCLE,
+    })
+
+    return options
+
+
+def _async_url(url: str) -> URL:
+    """
+    Get the asyncio driver url for a database url.
+
+    Args:
+        url (str): The database url.
+
+    Returns:
+        URL: The same database using its asyncio driver.
+    """
+
+    database_url = make_url(url)
+    backend = database_url.get_backend_name()
 
-engine = create_engine(DATABASE_URL)
+    return database_url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+def create_async(url: Optional[Union[str, URL]] = None) -> AsyncEngine:
+    """
+    Create an asyncio engine.
+
+    Args:
+        url (Optional[Union[str, URL]]): The async database url. Derived from DATABASE_URL by default.
+
+    Returns:
+        AsyncEngine: The engine.
+    """
+
+    database_url = make_url(url) if url else _async_url(DATABASE_URL)
+
+    return create_async_engine(database_url, **_engine_options(database_url, AsyncAdaptedQueuePool))
+
+
+engine = create_engine(DATABASE_URL, **_engine_options(make_url(DATABASE_URL), QueuePool))
+
+async_engine: Optional[AsyncEngine] = create_async(DATABASE_ASYNC_URL) if DATABASE_ASYNC else None
 
 meta = MetaData()
 
-connection = engine.connect()
+# Cookie holding the time until which a client that wrote reads from the primary
+PRIMARY_COOKIE = 'db_primary_until'
+
+# Users that wrote in the last DATABASE_READ_YOUR_WRITES seconds, by id
+recent_writers = TTLCache(maxsize=100_000, ttl=DATABASE_READ_YOUR_WRITES)
+
+
+class ReplicaSet:
+    """
+    Read replicas, chosen round-robin.
+
+    Health is checked passively: a replica that cannot be connected to is
+    skipped for `retry_after` seconds, the read that found it down falls
+    back to the primary.
+    """
+
+    def __init__(self, binds: List[Union[Engine, AsyncEngine]], retry_after: float):
+        """
+        Args:
+            binds (List[Union[Engine, AsyncEngine]]): The replica engines.
+            retry_after (float): Seconds a failed replica is skipped.
+        """
+
+        self.binds = binds
+        self.retry_after = retry_after
+        self._next = 0
+        self._down_until: Dict[int, float] = {}
+
+    def choose(self) -> Optional[Union[Engine, AsyncEngine]]:
+        """
+        Get the next healthy replica.
+
+        Returns:
+            Optional[Union[Engine, AsyncEngine]]: The replica, None if there are none up.
+        """
+
+        now = time.monotonic()
+
+        for _ in range(len(self.binds)):
+            index = self._next % len(self.binds)
+            self._next += 1
+
+            if self._down_until.get(index, 0.0) <= now:
+                return self.binds[index]
+
+        return None
+
+    def mark_down(self, bind: Union[Engine, AsyncEngine], error: Exception) -> None:
+        """
+        Skip a replica for `retry_after` seconds.
+
+        Args:
+            bind (Union[Engine, AsyncEngine]): The replica.
+            error (Exception): The connection error.
+        """
+
+        index = self.binds.index(bind)
+        self._down_until[index] = time.monotonic() + self.retry_after
+        logger.warning('Replica %d unavailable, skipped for %ss: %s',
+                       index, self.retry_after, str(error).splitlines()[0])
+
+
+def _replica(url: str) -> Union[Engine, AsyncEngine]:
+    if DATABASE_ASYNC:
+        return create_async(_async_url(url))
+
+    return create_engine(url, **_engine_options(make_url(url), QueuePool))
+
+
+replicas = ReplicaSet([_replica(url) for url in DATABASE_REPLICA_URLS], DATABASE_REPLICA_RETRY_AFTER)
+
+
+def _before_cursor_execute(connection: Connection, cursor: Any, statement: str, parameters: Any,
+                           context: Any, executemany: bool) -> None:
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(connection: Connection, cursor: Any, statement: str, parameters: Any,
+                          context: Any, executemany: bool) -> None:
+    record_query(statement, parameters, time.perf_counter() - context._query_started)
+
+
+def instrument(bind: Engine) -> None:
+    """
+    Record the statements sent by an engine, for the metrics and diagnostics.
+
+    Args:
+        bind (Engine): The engine, the `sync_engine` of an asyncio engine.
+    """
+
+    event.listen(bind, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(bind, 'after_cursor_execute', _after_cursor_execute)
+
+
+def _sync_engine(bind: Union[Engine, AsyncEngine]) -> Engine:
+    return bind.sync_engine if isinstance(bind, AsyncEngine) else bind
+
+
+def _pool_usage() -> List[Tuple[Tuple[str, ...], float]]:
+    engines = [('sync', engine)] + ([('async', async_engine.sync_engine)] if async_engine is not None else [])
+    engines += [(f'replica{index}', _sync_engine(bind)) for index, bind in enumerate(replicas.binds)]
+
+    # In-memory SQLite shares a single connection, its pool does not count them
+    return [((name, ), bind.pool.checkedout()) for name, bind in engines if hasattr(bind.pool, 'checkedout')]
+
+
+instrument(engine)
+
+if async_engine is not None:
+    instrument(async_engine.sync_engine)
+
+for replica in replicas.binds:
+    instrument(_sync_engine(replica))
+
+if METRICS_ENABLED:
+    register(Gauge('db_pool_checked_out_connections', 'Connections checked out of the pool, by engine.',
+                   _pool_usage, ('engine',)))
+
+
+class Database:
+    """
+    Database handle for a single unit of work.
+
+    Wraps either a pooled connection, whose blocking calls run in the
+    threadpool, or an asyncio connection, so callers await the same api
+    in both modes. The connection is checked out on the first statement,
+    so requests that never reach the database do not hold one.
+
+    A handle on a replica falls back to the primary if the replica cannot
+    be connected to.
+    """
+
+    def __init__(self,
+                 bind: Union[Engine, AsyncEngine],
+                 fallback: Optional[Union[Engine, AsyncEngine]] = None):
+        self.bind = bind
+        self.fallback = fallback
+        self.connection: Optional[Union[Connection, AsyncConnection]] = None
+        self.is_async = isinstance(bind, AsyncEngine)
+        self.dialect_name = bind.dialect.name
+
+    async def connect(self) -> Union[Connection, AsyncConnection]:
+        """
+        Check out the connection of the handle from the pool, once.
+
+        Returns:
+            Union[Connection, AsyncConnection]: The connection.
+        """
+
+        if self.connection is None:
+            try:
+                self.connection = await self._call(self.bind.connect)
+            except DBAPIError as e:
+                if self.fallback is None:
+                    raise
+
+                replicas.mark_down(self.bind, e)
+                self.bind, self.fallback = self.fallback, None
+                self.connection = await self._call(self.bind.connect)
+
+        return self.connection
+
+    async def _call(self, function: Callable, *args: Any) -> Any:
+        if self.is_async:
+            return await function(*args)
+
+        return await run_in_threadpool(function, *args)
+
+    async def execute(self,
+                      statement: Any,
+                      parameters: Optional[Union[Dict[str, Any], List[Dict[str, Any]]]] = None) -> Result:
+        """
+        Execute a statement.
+
+        Args:
+            statement (Any): The statement to execute.
+            parameters (Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]): The bound
+                parameters, a list executes the statement once per item (executemany).
+
+        Returns:
+            Result: The statement result.
+        """
+
+        connection = await self.connect()
+
+        return await self._call(connection.execute, statement, parameters)
+
+    async def fetch_one(self, statement: Any, parameters: Optional[Dict[str, Any]] = None) -> Optional[Row]:
+        """
+        Execute a statement and fetch its first row.
+
+        Args:
+            statement (Any): The statement to execute.
+            parameters (Optional[Dict[str, Any]]): The bound parameters.
+
+        Returns:
+            Optional[Row]: The first row, None if there are no rows.
+        """
+
+        connection = await self.connect()
+
+        if self.is_async:
+            return (await connection.execute(statement, parameters)).fetchone()
+
+        return await run_in_threadpool(lambda: connection.execute(statement, parameters).fetchone())
+
+    async def fetch_all(self, statement: Any, parameters: Optional[Dict[str, Any]] = None) -> List[Row]:
+        """
+        Execute a statement and fetch all its rows.
+
+        Args:
+            statement (Any): The statement to execute.
+            parameters (Optional[Dict[str, Any]]): The bound parameters.
+
+        Returns:
+            List[Row]: The rows.
+        """
+
+        connection = await self.connect()
+
+        if self.is_async:
+            return (await connection.execute(statement, parameters)).fetchall()
+
+        return await run_in_threadpool(lambda: connection.execute(statement, parameters).fetchall())
+
+    async def stream(self,
+                     statement: Any,
+                     parameters: Optional[Dict[str, Any]] = None,
+                     size: int = 1000) -> AsyncIterator[List[Row]]:
+        """
+        Execute a statement with a server-side cursor and yield its rows in chunks.
+
+        Only one chunk is held in memory at a time, whatever the number of
+        rows. The connection is busy until the iteration ends.
+
+        Args:
+            statement (Any): The statement to execute.
+            parameters (Optional[Dict[str, Any]]): The bound parameters.
+            size (int): Number of rows per chunk.
+
+        Yields:
+            List[Row]: The next rows.
+        """
+
+        connection = await self.connect()
+
+        if self.is_async:
+            result = await connection.stream(statement, parameters)
+
+            try:
+                async for partition in result.partitions(size):
+                    yield partition
+            finally:
+                await result.close()
+
+            return
+
+        result = await run_in_threadpool(connection.execute, statement, parameters, {'stream_results': True})
+
+        try:
+            while True:
+                partition = await run_in_threadpool(result.fetchmany, size)
+
+                if not partition:
+                    break
+
+                yield partition
+        finally:
+            await run_in_threadpool(result.close)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator['Database']:
+        """
+        Run the enclosed statements in a transaction.
+
+        Commits when the block exits normally and rolls back on errors. Reads
+        made before the block have already begun the transaction, so they are
+        committed together with the changes.
+
+        Yields:
+            Database: The same handle.
+        """
+
+        connection = await self.connect()
+
+        if not connection.in_transaction():
+            await self._call(connection.begin)
+
+        try:
+            yield self
+        except BaseException:
+            await self._call(connection.rollback)
+            raise
+
+        await self._call(connection.commit)
+
+    async def close(self) -> None:
+        """
+        Return the connection to the pool, if it was checked out.
+        """
+
+        if self.connection is not None:
+            await self._call(self.connection.close)
+            self.connection = None
+
+
+@asynccontextmanager
+async def database(read_only: bool = False) -> AsyncIterator[Database]:
+    """
+    Database handle on the configured engine.
+
+    Args:
+        read_only (bool): Use a replica, if any is configured and up.
+
+    Yields:
+        Database: The database handle, its connection is returned to the pool on exit.
+    """
+
+    primary = async_engine if async_engine is not None else engine
+    replica = replicas.choose() if read_only and replicas.binds else None
+
+    db = Database(replica, fallback=primary) if replica is not None else Database(primary)
+
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+async def get_db() -> AsyncIterator[Database]:
+    """
+    Database dependency.
+
+    The connection used by the current request, if any, is returned to the
+    pool once the request is done, even on errors.
+
+    Yields:
+        Database: The database handle.
+    """
+
+    async with database() as db:
+        yield db
+
+
+def record_write(authorization: Optional[str]) -> None:
+    """
+    Keep the reads of the authenticated user on the primary for
+    DATABASE_READ_YOUR_WRITES seconds, after a successful write.
+
+    Args:
+        authorization (Optional[str]): The `Authorization` header of the write.
+    """
+
+    principal = bearer_principal(authorization)
+
+    if principal is not None:
+        recent_writers.set(principal, True)
+
+
+def reads_from_replica(request: Request) -> bool:
+    """
+    Check whether the reads of a request may go to a replica.
+
+    Clients that wrote in the last DATABASE_READ_YOUR_WRITES seconds read
+    from the primary, so they see their own changes despite the replication
+    lag. They are recognized by the user of their access token, or by the
+    `PRIMARY_COOKIE` cookie for the ones that keep cookies. Users are
+    remembered by the process that handled the write only, the cookie works
+    across processes.
+
+    Args:
+        request (Request): The request.
+
+    Returns:
+        bool: False if the client must read from the primary.
+    """
+
+    if not replicas.binds:
+        return False
+
+    try:
+        if float(request.cookies.get(PRIMARY_COOKIE, 0)) >= time.time():
+            return False
+    except ValueError:
+        pass
+
+    principal = bearer_principal(request.headers.get('authorization'))
+
+    return principal is None or recent_writers.get(principal) is None
+
+
+async def get_read_db(request: Request) -> AsyncIterator[Database]:
+    """
+    Database dependency of the read-only routes.
+
+    Reads go to a replica when there are any, unless the client just wrote.
+
+    Yields:
+        Database: The database handle.
+    """
+
+    async with database(read_only=reads_from_replica(request)) as db:
+        yield db
+
+
+PING = text('SELECT 1')
+
+
+async def wait_for_database(attempts: int = DATABASE_CONNECT_ATTEMPTS,
+                            backoff: float = DATABASE_CONNECT_BACKOFF) -> None:
+    """
+    Check that the database accepts connections, retrying with an exponential backoff.
+
+    The connection is returned to the pool, so the first request reuses it.
+
+    Args:
+        attempts (int): Connection attempts before giving up.
+        backoff (float): Seconds before the second attempt, doubled after each failure.
+
+    Raises:
+        DBAPIError: The error of the last attempt.
+    """
+
+    for attempt in range(1, attempts + 1):
+        try:
+            async with database() as db:
+                await db.execute(PING)
+            return
+        except DBAPIError as e:
+            if attempt == attempts:
+                raise
+
+            delay = min(backoff * 2 ** (attempt - 1), DATABASE_CONNECT_MAX_BACKOFF)
+            logger.warning('Database unavailable (attempt %d of %d), retrying in %.1fs: %s',
+                           attempt, attempts, delay, str(e).splitlines()[0])
+            await asyncio.sleep(delay)
+
+
+def reset_after_fork() -> None:
+    """
+    Replace the connection pools of the engines in a forked process.
+
+    Connections inherited from the parent are left open for it instead of
+    being closed, the new pools open their own.
+    """
+
+    for bind in [engine, async_engine] + replicas.binds:
+        if bind is not None:
+            bind = _sync_engine(bind)
+            bind.pool = bind.pool.recreate()
+
+
+async def dispose_engines() -> None:
+    """
+    Close every pooled connection of the engines.
+    """
+
+    for bind in [async_engine] + replicas.binds:
+        if isinstance(bind, AsyncEngine):
+            await bind.dispose()
+        elif bind is not None:
+            await run_in_threadpool(bind.dispose)
+
+    await run_in_threadpool(engine.dispose)
@@ -5,7 +5,59 @@ _env = environ.Env(
     DEBUG=(bool, False),
     SECRET_KEY=(str, 'secret-key'),
     PORT=(int, 8000),
+    SERVER_MULTIPROCESS=(bool, False),
+    SERVER_WORKERS=(int, 0),
+    SERVER_MAX_REQUESTS=(int, 10000),
+    SERVER_MAX_REQUESTS_JITTER=(int, 1000),
+    SERVER_GRACEFUL_TIMEOUT=(int, 30),
+    PAGINATION_DEFAULT_LIMIT=(int, 20),
+    PAGINATION_MAX_LIMIT=(int, 100),
+    FAST_JSON_RESPONSES=(bool, False),
+    METRICS_ENABLED=(bool, True),
+    CONCURRENCY_LIMIT_ENABLED=(bool, False),
+    CONCURRENCY_LIMIT_INITIAL=(int, 20),
+    CONCURRENCY_LIMIT_MIN=(int, 2),
+    CONCURRENCY_LIMIT_MAX=(int, 200),
+    CONCURRENCY_LIMIT_BACKOFF=(float, 0.9),
+    CONCURRENCY_LIMIT_RETRY_AFTER=(int, 1),
+    CONCURRENCY_TARGET_LATENCY_AUTH=(float, 1000.0),
+    CONCURRENCY_TARGET_LATENCY_READS=(float, 100.0),
+    CONCURRENCY_TARGET_LATENCY_WRITES=(float, 250.0),
+    PROFILING_ENABLED=(bool, False),
+    PROFILING_TOKEN=(str, ''),
+    PROFILING_SAMPLE_RATE=(float, 0.0),
+    PROFILING_FORMAT=(str, 'pstats'),
+    PROFILING_INTERVAL=(float, 1.0),
+    PROFILING_DIRECTORY=(str, 'profiles'),
+    PROFILING_MAX_FILES=(int, 100),
+    TWEETS_BATCH_MAX_SIZE=(int, 100),
+    TWEETS_GROUP_COMMIT=(bool, False),
+    TWEETS_EXPORT_CHUNK_SIZE=(int, 1000),
+    TWEETS_GROUP_COMMIT_MAX_BATCH=(int, 100),
+    TWEETS_GROUP_COMMIT_MAX_DELAY=(float, 5.0),
+    TIMELINE_FANOUT_LIMIT=(int, 10000),
+    TIMELINE_BACKFILL_SIZE=(int, 20),
+    PRINCIPAL_CACHE_SIZE=(int, 10000),
+    PRINCIPAL_CACHE_TTL=(int, 60),
+    JWT_VERIFIED_CACHE_SIZE=(int, 50000),
+    PASSWORD_HASHING_WORKERS=(int, 0),
+    PASSWORD_HASHING_MAX_PENDING=(int, 64),
     USES_DOCKER=(str, 'No'),
+    DATABASE_ASYNC=(bool, False),
+    DATABASE_ASYNC_URL=(str, ''),
+    DATABASE_POOL_SIZE=(int, 5),
+    DATABASE_POOL_MAX_OVERFLOW=(int, 10),
+    DATABASE_POOL_TIMEOUT=(int, 30),
+    DATABASE_POOL_PRE_PING=(bool, True),
+    DATABASE_POOL_RECYCLE=(int, 3600),
+    DATABASE_CONNECT_ATTEMPTS=(int, 6),
+    DATABASE_CONNECT_BACKOFF=(float, 0.5),
+    DATABASE_CONNECT_MAX_BACKOFF=(float, 10.0),
+    DATABASE_REPLICA_URLS=(list, []),
+    DATABASE_REPLICA_RETRY_AFTER=(int, 30),
+    DATABASE_READ_YOUR_WRITES=(int, 5),
+    DATABASE_SLOW_QUERY_MS=(float, 200.0),
+    DATABASE_N_PLUS_ONE_THRESHOLD=(int, 5),
 )
 
 if _env('USES_DOCKER') != 'Yes':
@@ -16,10 +68,76 @@ DEBUG = _env('DEBUG')
 SECRET_KEY = _env('SECRET_KEY')
 PORT = _env('PORT')
 
+# Serve with gunicorn and uvicorn workers forked from a preloaded app, instead of a single uvicorn process
+SERVER_MULTIPROCESS = _env('SERVER_MULTIPROCESS')
+SERVER_WORKERS = _env('SERVER_WORKERS')  # Processes, 0 uses one per core
+SERVER_MAX_REQUESTS = _env('SERVER_MAX_REQUESTS')  # Requests before a worker is replaced, 0 disables
+SERVER_MAX_REQUESTS_JITTER = _env('SERVER_MAX_REQUESTS_JITTER')  # Random extra requests, so workers are not replaced at once
+SERVER_GRACEFUL_TIMEOUT = _env('SERVER_GRACEFUL_TIMEOUT')  # Seconds a replaced worker has to finish its requests
+
+# Pagination
+PAGINATION_DEFAULT_LIMIT = _env('PAGINATION_DEFAULT_LIMIT')
+PAGINATION_MAX_LIMIT = _env('PAGINATION_MAX_LIMIT')
+
+# Encode responses with orjson, list endpoints also skip the response model validation
+FAST_JSON_RESPONSES = _env('FAST_JSON_RESPONSES')
+
+# Record request, database and hashing metrics, served by /metrics
+METRICS_ENABLED = _env('METRICS_ENABLED')
+
+# Adaptive concurrency limits of the auth, reads and writes route groups, excess requests get a 503
+CONCURRENCY_LIMIT_ENABLED = _env('CONCURRENCY_LIMIT_ENABLED')
+CONCURRENCY_LIMIT_INITIAL = _env('CONCURRENCY_LIMIT_INITIAL')
+CONCURRENCY_LIMIT_MIN = _env('CONCURRENCY_LIMIT_MIN')
+CONCURRENCY_LIMIT_MAX = _env('CONCURRENCY_LIMIT_MAX')
+CONCURRENCY_LIMIT_BACKOFF = _env('CONCURRENCY_LIMIT_BACKOFF')  # Factor applied to a limit when latency is over target
+CONCURRENCY_LIMIT_RETRY_AFTER = _env('CONCURRENCY_LIMIT_RETRY_AFTER')  # Seconds
+CONCURRENCY_TARGET_LATENCY_AUTH = _env('CONCURRENCY_TARGET_LATENCY_AUTH')  # Milliseconds
+CONCURRENCY_TARGET_LATENCY_READS = _env('CONCURRENCY_TARGET_LATENCY_READS')  # Milliseconds
+CONCURRENCY_TARGET_LATENCY_WRITES = _env('CONCURRENCY_TARGET_LATENCY_WRITES')  # Milliseconds
+
+# Request profiler and /debug/profiles, always enabled in debug mode.
+# Requests sending PROFILING_TOKEN in the X-Profile header are profiled, any value in debug mode.
+PROFILING_ENABLED = _env('PROFILING_ENABLED') or DEBUG
+PROFILING_TOKEN = _env('PROFILING_TOKEN')
+PROFILING_SAMPLE_RATE = _env('PROFILING_SAMPLE_RATE')  # Fraction of the other requests profiled
+# 'pstats' (cProfile of the event loop thread only) or 'collapsed' (sampled stacks of every thread, for flame graphs),
+# use 'collapsed' for the sync routes and the database calls, which run in the threadpool
+PROFILING_FORMAT = _env('PROFILING_FORMAT')
+PROFILING_INTERVAL = _env('PROFILING_INTERVAL')  # Milliseconds between samples of the collapsed format
+PROFILING_DIRECTORY = _env('PROFILING_DIRECTORY')
+PROFILING_MAX_FILES = _env('PROFILING_MAX_FILES')  # Profiles kept, the oldest are removed
+
 # Database
 DATABASE_URL = _env('DATABASE_URL')
 DATABASE_CONFIG = _env.db()
 
+# Run queries through the asyncio engine instead of the threadpool.
+# The async url defaults to DATABASE_URL with its async driver (aiomysql, aiosqlite).
+DATABASE_ASYNC = _env('DATABASE_ASYNC')
+DATABASE_ASYNC_URL = _env('DATABASE_ASYNC_URL') or None
+
+# Connection pool
+DATABASE_POOL_SIZE = _env('DATABASE_POOL_SIZE')
+DATABASE_POOL_MAX_OVERFLOW = _env('DATABASE_POOL_MAX_OVERFLOW')
+DATABASE_POOL_TIMEOUT = _env('DATABASE_POOL_TIMEOUT')  # Seconds
+DATABASE_POOL_PRE_PING = _env('DATABASE_POOL_PRE_PING')
+DATABASE_POOL_RECYCLE = _env('DATABASE_POOL_RECYCLE')  # Seconds
+
+# Connection check on startup, the schema is created by `python manage.py migrate`
+DATABASE_CONNECT_ATTEMPTS = _env('DATABASE_CONNECT_ATTEMPTS')
+DATABASE_CONNECT_BACKOFF = _env('DATABASE_CONNECT_BACKOFF')  # Seconds before the first retry, doubled after each one
+DATABASE_CONNECT_MAX_BACKOFF = _env('DATABASE_CONNECT_MAX_BACKOFF')  # Seconds
+
+# Read replicas, comma separated urls. Read-only routes are spread over them round-robin.
+DATABASE_REPLICA_URLS = _env('DATABASE_REPLICA_URLS')
+DATABASE_REPLICA_RETRY_AFTER = _env('DATABASE_REPLICA_RETRY_AFTER')  # Seconds a replica that failed to connect is skipped
+DATABASE_READ_YOUR_WRITES = _env('DATABASE_READ_YOUR_WRITES')  # Seconds a client reads from the primary after a write
+
+# Query diagnostics, X-DB-Queries and X-DB-Time response headers are sent in debug mode
+DATABASE_SLOW_QUERY_MS = _env('DATABASE_SLOW_QUERY_MS')  # Statements logged with their parameters, 0 disables
+DATABASE_N_PLUS_ONE_THRESHOLD = _env('DATABASE_N_PLUS_ONE_THRESHOLD')  # Repeats of a statement per request logged, 0 disables
+
 USERS_FILE = 'users.json'
 USERS_STORAGE = os.path.join(os.path.dirname(__file__), '..', USERS_FILE)
 
@@ -32,3 +150,27 @@ JWT_ACCESS_TOKEN_EXPIRATION = 60 * 24 # 1 day
 
 JWT_REFRESH_TOKEN_TYPE = 'refresh'
 JWT_REFRESH_TOKEN_EXPIRATION = 60 * 24 * 7 # 1 week
+
+# Verified tokens kept until they expire, 0 disables the cache
+JWT_VERIFIED_CACHE_SIZE = _env('JWT_VERIFIED_CACHE_SIZE')
+
+# Tweets
+TWEETS_BATCH_MAX_SIZE = _env('TWEETS_BATCH_MAX_SIZE')  # Tweets created by a single batch request
+TWEETS_EXPORT_CHUNK_SIZE = _env('TWEETS_EXPORT_CHUNK_SIZE')  # Rows read and sent at once by the export
+
+# Group commit of the tweets created by concurrent requests
+TWEETS_GROUP_COMMIT = _env('TWEETS_GROUP_COMMIT')
+TWEETS_GROUP_COMMIT_MAX_BATCH = _env('TWEETS_GROUP_COMMIT_MAX_BATCH')  # Tweets per transaction
+TWEETS_GROUP_COMMIT_MAX_DELAY = _env('TWEETS_GROUP_COMMIT_MAX_DELAY')  # Milliseconds a tweet waits for its batch
+
+# Timelines
+TIMELINE_FANOUT_LIMIT = _env('TIMELINE_FANOUT_LIMIT')  # Followers above which tweets are merged on read
+TIMELINE_BACKFILL_SIZE = _env('TIMELINE_BACKFILL_SIZE')  # Latest tweets copied to a timeline on follow
+
+# Authenticated users cached by id, 0 disables the cache
+PRINCIPAL_CACHE_SIZE = _env('PRINCIPAL_CACHE_SIZE')
+PRINCIPAL_CACHE_TTL = _env('PRINCIPAL_CACHE_TTL')  # Seconds
+
+# Passwords
+PASSWORD_HASHING_WORKERS = _env('PASSWORD_HASHING_WORKERS')  # Processes, 0 uses one per core
+PASSWORD_HASHING_MAX_PENDING = _env('PASSWORD_HASHING_MAX_PENDING')  # Hashes in flight before 503
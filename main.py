@@ -1,10 +1,60 @@
+import os
+
 import uvicorn  # type: ignore
 
 from config.settings import PORT
 from config.settings import DEBUG
+from config.settings import SERVER_MULTIPROCESS
+from config.settings import SERVER_WORKERS
+from config.settings import SERVER_MAX_REQUESTS
+from config.settings import SERVER_MAX_REQUESTS_JITTER
+from config.settings import SERVER_GRACEFUL_TIMEOUT
+
+
+def serve_multiprocess() -> None:
+    """
+    Serve the app from several uvicorn worker processes managed by gunicorn.
+
+    The app is imported once in the master and the workers are forked from
+    it, sharing the imported modules copy-on-write. Each worker is replaced
+    after about SERVER_MAX_REQUESTS requests, once its requests in flight
+    are done, to bound memory growth.
+    """
+
+    from gunicorn.app.base import BaseApplication  # type: ignore
+
+    from app import app
+    from config.db import reset_after_fork
+
+    class Server(BaseApplication):
+
+        def load_config(self):
+            options = {
+                'bind': f'0.0.0.0:{PORT}',
+                'workers': SERVER_WORKERS or os.cpu_count(),
+                'worker_class': 'uvicorn.workers.UvicornWorker',
+                'preload_app': True,
+                'max_requests': SERVER_MAX_REQUESTS,
+                'max_requests_jitter': SERVER_MAX_REQUESTS_JITTER,
+                'graceful_timeout': SERVER_GRACEFUL_TIMEOUT,
+                # Database connections must not be shared with the master
+                'post_fork': lambda server, worker: reset_after_fork(),
+            }
+
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    Server().run()
+
 
 if __name__ == "__main__":
-    uvicorn.run('app:app',
-                host='0.0.0.0',
-                port=PORT,
-                reload=DEBUG)
+    if SERVER_MULTIPROCESS:
+        serve_multiprocess()
+    else:
+        uvicorn.run('app:app',
+                    host='0.0.0.0',
+                    port=PORT,
+                    reload=DEBUG)
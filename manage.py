@@ -0,0 +1,110 @@
+"""Management commands.
+
+Usage:
+    $ python manage.py migrate
+    $ python manage.py load users [users.json]
+    $ python manage.py load tweets [tweets.jsonl] --chunk-size 10000
+"""
+import sys
+import json
+import asyncio
+import argparse
+
+from typing import Any
+
+from config.settings import USERS_STORAGE
+from config.settings import TWEETS_STORAGE
+
+
+def _create_indexes(connection: Any, meta: Any) -> None:
+    # create_all skips the existing tables, so add the indexes declared since
+    for table in meta.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def _upgrade_timestamps(connection: Any, meta: Any) -> None:
+    # MySQL timestamps declared with a fractional precision since the table was created
+    if connection.dialect.name != 'mysql':
+        return
+
+    from sqlalchemy import inspect
+
+    inspector = inspect(connection)
+    ddl = connection.dialect.ddl_compiler(connection.dialect, None)
+
+    for table in meta.sorted_tables:
+        existing = {column['name']: column['type'] for column in inspector.get_columns(table.name)}
+
+        for column in table.columns:
+            declared = column.type.compile(dialect=connection.dialect)
+            current = existing[column.name].compile(dialect=connection.dialect) if column.name in existing else None
+
+            if current is not None and current != declared and current.startswith('TIMESTAMP') \
+                    and declared.startswith('TIMESTAMP'):
+                connection.exec_driver_sql(
+                    f'ALTER TABLE {ddl.preparer.format_table(table)} MODIFY {ddl.get_column_specification(column)}')
+
+
+def migrate(args: argparse.Namespace) -> None:
+    import models  # noqa: F401, registers the tables
+    from config.db import meta
+    from config.db import engine
+    from config.db import wait_for_database
+    from utils.search import create_search_index
+
+    asyncio.run(wait_for_database())
+
+    with engine.begin() as connection:
+        meta.create_all(connection)
+        _create_indexes(connection, meta)
+        _upgrade_timestamps(connection, meta)
+        create_search_index(connection)
+
+
+def load(args: argparse.Namespace) -> None:
+    from utils.loader import Loader
+
+    loader = Loader(chunk_size=args.chunk_size,
+                    workers=args.workers,
+                    rounds=args.rounds,
+                    restart=args.restart)
+
+    try:
+        if args.kind == 'users':
+            stats = loader.load_users(args.path or USERS_STORAGE)
+        else:
+            stats = loader.load_tweets(args.path or TWEETS_STORAGE)
+    except RuntimeError as e:
+        sys.exit(str(e))
+
+    json.dump(stats, sys.stdout)
+    print()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Management commands.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    migrate_parser = commands.add_parser('migrate',
+                                         help='Create the missing tables, indexes and search index, '
+                                              'and widen the MySQL timestamps to microseconds')
+    migrate_parser.set_defaults(handler=migrate)
+
+    load_parser = commands.add_parser('load',
+                                      help='Bulk load users or tweets from a JSON array or JSON Lines file')
+    load_parser.add_argument('kind', choices=['users', 'tweets'])
+    load_parser.add_argument('path', nargs='?',
+                             help='Defaults to USERS_STORAGE / TWEETS_STORAGE, .jsonl and .ndjson are read by line')
+    load_parser.add_argument('--chunk-size', type=int, default=5000, help='Records per transaction')
+    load_parser.add_argument('--workers', type=int, default=None, help='Password hashing processes')
+    load_parser.add_argument('--rounds', type=int, default=12, help='bcrypt cost factor of the passwords')
+    load_parser.add_argument('--restart', action='store_true', help='Ignore the saved progress')
+    load_parser.set_defaults(handler=load)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
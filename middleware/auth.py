@@ -11,10 +11,15 @@ from fastapi import status
 
 # Utilities
 from config import settings
-from utils.jsonwebtoken import verify_token
+from utils.jsonwebtoken import verify_token_cached
+from utils.cache import TTLCache
+from utils.metrics import CallbackCounter
+from utils.metrics import Gauge
+from utils.metrics import register
 
 # Database
-from config.db import connection
+from config.db import Database
+from config.db import get_db
 
 # Models
 from models.user import User
@@ -23,6 +28,19 @@ from models.user import User
 from schemas.user import User as UserSchema
 
 
+# Authenticated users by id. Routes that change or delete a user must evict it.
+principal_cache = TTLCache(maxsize=settings.PRINCIPAL_CACHE_SIZE,
+                           ttl=settings.PRINCIPAL_CACHE_TTL)
+
+if settings.METRICS_ENABLED:
+    register(CallbackCounter('principal_cache_hits_total', 'Authenticated users found in the cache.',
+                             lambda: [((), principal_cache.hits)]))
+    register(CallbackCounter('principal_cache_misses_total', 'Authenticated users loaded from the database.',
+                             lambda: [((), principal_cache.misses)]))
+    register(Gauge('principal_cache_entries', 'Authenticated users in the cache, expired ones included.',
+                   lambda: [((), principal_cache.stats()['size'])]))
+
+
 class JWTBearer(HTTPBearer):
     """
     JWT token Handler.
@@ -58,7 +76,7 @@ def validate_acccess_token(token: str = Depends(JWTBearer())) -> Dict[str, Any]:
                                    detail='Invalid credentials.',
                                    headers={'WWW-Authenticate': 'Bearer'})
 
-    decoded_token = verify_token(token)
+    decoded_token = verify_token_cached(token)
 
     if not decoded_token:
         raise base_exception
@@ -69,9 +87,15 @@ def validate_acccess_token(token: str = Depends(JWTBearer())) -> Dict[str, Any]:
     return decoded_token
 
 
-def get_current_user(decoded_token: Dict[str, any] = Depends(validate_acccess_token)) -> User:
+async def get_current_user(
+    decoded_token: Dict[str, any] = Depends(validate_acccess_token),
+    db: Database = Depends(get_db),
+) -> User:
     """
     Get current user.
+
+    Users are served from `principal_cache` when possible, so authenticated
+    requests don't query the user on every call.
     """
 
     base_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
@@ -81,9 +105,18 @@ def get_current_user(decoded_token: Dict[str, any] = Depends(validate_acccess_to
     if not isinstance(decoded_token, dict) or not 'sub' in decoded_token:
         raise base_exception
 
-    user = connection.execute(User.select().where(User.c.id == decoded_token.get('sub'))).fetchone()
+    user_id = decoded_token.get('sub')
+
+    cached_user = principal_cache.get(user_id)
+    if cached_user is not None:
+        return cached_user
+
+    user = await db.fetch_one(User.select().where(User.c.id == user_id))
 
     if not user:
         raise base_exception
 
-    return UserSchema(**user)
+    current_user = UserSchema(**user._mapping)
+    principal_cache.set(user_id, current_user)
+
+    return current_user
@@ -0,0 +1,49 @@
+# Starlette
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+# Settings
+from config.settings import DEBUG
+
+# Utils
+from utils.diagnostics import track_request_queries
+from utils.diagnostics import check_n_plus_one
+
+
+class QueryDiagnosticsMiddleware:
+    """
+    Attribute the statements sent to the database to the current request.
+
+    In debug mode the number of statements and their total time, in
+    milliseconds, are sent in the `X-DB-Queries` and `X-DB-Time` headers.
+    They cover the statements executed before the response starts, a
+    streamed body may run more. Statements repeated by a request are logged
+    as suspected N+1 queries once it is done.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        queries = track_request_queries()
+
+        async def send_with_headers(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(scope=message)
+                headers['X-DB-Queries'] = str(queries.count)
+                headers['X-DB-Time'] = f'{queries.seconds * 1000:.3f}'
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers if DEBUG else send)
+        finally:
+            check_n_plus_one(queries, scope['method'], scope['path'])
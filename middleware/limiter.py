@@ -0,0 +1,67 @@
+import time
+
+# Starlette
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+# Settings
+from config.settings import CONCURRENCY_LIMIT_RETRY_AFTER
+
+# Utils
+from utils.limiter import limits
+from utils.limiter import route_group
+from utils.limiter import CONCURRENCY_REJECTED
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    Shed the requests over the adaptive concurrency limit of their group.
+
+    Auth, reads and writes have separate limits, so slow logins do not
+    starve reads. Rejected requests get a 503 with `Retry-After` right away
+    instead of queueing for the threadpool or a database connection. The
+    limit adapts to the time until the response starts, a streamed body
+    keeps its slot without counting as slow.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        group = route_group(scope['method'], scope['path']) if scope['type'] == 'http' else None
+
+        if group is None:
+            await self.app(scope, receive, send)
+            return
+
+        limit = limits[group]
+
+        if not limit.acquire():
+            CONCURRENCY_REJECTED.inc(group)
+            response = JSONResponse({'detail': 'Server busy, try again later.'},
+                                    status_code=503,
+                                    headers={'Retry-After': str(CONCURRENCY_LIMIT_RETRY_AFTER)})
+            await response(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        latency = None
+        failed = True
+
+        async def send_with_latency(message: Message) -> None:
+            nonlocal latency, failed
+
+            if message['type'] == 'http.response.start':
+                latency = time.perf_counter() - started
+                failed = message['status'] >= 500
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_latency)
+        finally:
+            limit.release(latency if latency is not None else time.perf_counter() - started, failed)
@@ -0,0 +1,80 @@
+import time
+
+from typing import Any
+from typing import Dict
+
+# Starlette
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+# Utils
+from utils.metrics import HTTP_REQUESTS
+from utils.metrics import HTTP_REQUEST_DURATION
+from utils.metrics import DB_QUERIES
+from utils.metrics import DB_QUERIES_DURATION
+from utils.diagnostics import request_queries
+
+
+UNMATCHED_ROUTE = 'unmatched'
+
+
+class MetricsMiddleware:
+    """
+    Record the count, status and latency of the requests per route.
+
+    Requests are labelled with the path template of their route, such as
+    `/tweets/{id}`, so the number of series stays bounded. The
+    statements sent to the database while handling a request are added to
+    the counters of its route, they are tracked by the outer
+    `QueryDiagnosticsMiddleware`.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._routes: Dict[Any, str] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        queries = request_queries()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = self._route(scope)
+            method = scope['method']
+
+            HTTP_REQUESTS.inc(method, route, str(status_code))
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, method, route)
+
+            if queries is not None and queries.count:
+                DB_QUERIES.inc(route, amount=queries.count)
+                DB_QUERIES_DURATION.inc(route, amount=queries.seconds)
+
+    def _route(self, scope: Scope) -> str:
+        # The router stores the matched endpoint in the scope
+        endpoint = scope.get('endpoint')
+
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+
+        if endpoint not in self._routes:
+            paths = {getattr(route, 'endpoint', None): route.path for route in scope['app'].routes}
+            self._routes[endpoint] = paths.get(endpoint, UNMATCHED_ROUTE)
+
+        return self._routes[endpoint]
@@ -0,0 +1,77 @@
+import random
+
+from typing import Optional
+
+# Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+# Settings
+from config.settings import PROFILING_SAMPLE_RATE
+
+# Utils
+from utils.profiling import is_allowed
+from utils.profiling import start_profile
+from utils.profiling import stop_profile
+
+
+PROFILE_HEADER = b'x-profile'
+# Reading the profiles is not profiled
+UNPROFILED_PATH = '/debug/profiles'
+
+
+class ProfilerMiddleware:
+    """
+    Profile whole requests and save the profiles.
+
+    Requests sending an allowed `X-Profile` header are profiled, and a
+    PROFILING_SAMPLE_RATE fraction of the others. The name of the saved
+    profile is sent in the `X-Profile-Id` header, one request is profiled
+    at a time.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or not self._sampled(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = start_profile(scope['method'], scope['path'])
+
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_id(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                MutableHeaders(scope=message)['X-Profile-Id'] = profile.name
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            stop_profile(profile)
+            await run_in_threadpool(profile.save)
+
+    def _sampled(self, scope: Scope) -> bool:
+        if scope['path'].startswith(UNPROFILED_PATH):
+            return False
+
+        token: Optional[str] = None
+
+        for name, value in scope['headers']:
+            if name == PROFILE_HEADER:
+                token = value.decode('latin-1')
+
+        if token is not None and is_allowed(token):
+            return True
+
+        return PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE
@@ -0,0 +1,53 @@
+import time
+
+# Starlette
+from starlette.datastructures import Headers
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+# Database
+from config.db import PRIMARY_COOKIE
+from config.db import record_write
+
+# Settings
+from config.settings import DATABASE_READ_YOUR_WRITES
+
+# Utils
+from utils.limiter import READ_METHODS
+
+
+class ReadYourWritesMiddleware:
+    """
+    Keep the reads of a client on the primary right after it writes.
+
+    After a successful write, the user of its access token reads from the
+    primary for DATABASE_READ_YOUR_WRITES seconds, so a tweet is visible as
+    soon as it was created even if the replicas lag behind. A cookie
+    holding the end of that delay also covers the clients without a token
+    and the other server processes.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or scope['method'] in READ_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            if message['type'] == 'http.response.start' and message['status'] < 400:
+                record_write(Headers(scope=scope).get('authorization'))
+
+                until = time.time() + DATABASE_READ_YOUR_WRITES
+                MutableHeaders(scope=message).append(
+                    'set-cookie',
+                    f'{PRIMARY_COOKIE}={until:.3f}; Max-Age={DATABASE_READ_YOUR_WRITES}; Path=/; HttpOnly; SameSite=Lax')
+
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Optional
 
 # Pydantic
 from pydantic import BaseModel
@@ -22,3 +23,13 @@ class TimestampMixin(BaseModel):
 
     updated_at: datetime = Field(default=None,
                                  description='The time the document was last updated.')
+
+
+class CursorPaginationMixin(BaseModel):
+    """Cursor Pagination Model Mixin.
+
+    This mixin is used to add the cursor of the next page to a page of results.
+    """
+
+    next_cursor: Optional[str] = Field(default=None,
+                                       description='Cursor of the next page, null on the last page.')
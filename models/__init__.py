@@ -1,2 +1,6 @@
 from .user import User
 from .tweet import Tweet
+from .follow import Follow
+from .timeline import Timeline
+from .timeline import PullAuthor
+from .load_progress import LoadProgress
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+# SQLAlchemy
+from sqlalchemy import Table
+from sqlalchemy import Column
+from sqlalchemy import Integer
+from sqlalchemy import TIMESTAMP
+from sqlalchemy import ForeignKey
+from sqlalchemy import Index
+
+# Database
+from config.db import meta
+
+
+# Users followed by each user
+Follow = Table(
+    'follows',
+    meta,
+    Column('follower_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+    Column('followee_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+    Column('created_at', TIMESTAMP, default=datetime.utcnow),
+    # Followers of a user, for the fan-out of their tweets
+    Index('ix_follows_followee_id_follower_id', 'followee_id', 'follower_id'),
+)
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+# SQLAlchemy
+from sqlalchemy import Table
+from sqlalchemy import Column
+from sqlalchemy import Integer
+from sqlalchemy import String
+from sqlalchemy import TIMESTAMP
+
+# Database
+from config.db import meta
+
+
+# Records of each file already committed by the bulk loader, to resume it
+LoadProgress = Table(
+    'load_progress',
+    meta,
+    Column('source', String(255), primary_key=True),
+    Column('records', Integer, nullable=False, default=0),
+    Column('updated_at', TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow),
+)
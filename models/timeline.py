@@ -0,0 +1,35 @@
+from datetime import datetime
+
+# SQLAlchemy
+from sqlalchemy import Table
+from sqlalchemy import Column
+from sqlalchemy import Integer
+from sqlalchemy import TIMESTAMP
+from sqlalchemy import ForeignKey
+from sqlalchemy import Index
+
+# Database
+from config.db import meta
+
+
+# Home timeline entries, written when a tweet is created
+Timeline = Table(
+    'timelines',
+    meta,
+    Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+    Column('tweet_id', Integer, ForeignKey('tweets.id', ondelete='CASCADE'), primary_key=True),
+    Column('author_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+    Column('created_at', TIMESTAMP, nullable=False),
+    # Keyset pagination of a home timeline
+    Index('ix_timelines_user_id_created_at_tweet_id', 'user_id', 'created_at', 'tweet_id'),
+    # Entries of an author, removed on unfollow
+    Index('ix_timelines_user_id_author_id', 'user_id', 'author_id'),
+)
+
+# Authors with too many followers to fan out, their tweets are merged into timelines on read
+PullAuthor = Table(
+    'timeline_pull_authors',
+    meta,
+    Column('author_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+    Column('created_at', TIMESTAMP, default=datetime.utcnow),
+)
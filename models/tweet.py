@@ -7,6 +7,10 @@ from sqlalchemy import Integer
 from sqlalchemy import String
 from sqlalchemy import TIMESTAMP
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
+from sqlalchemy.dialects.mysql import TIMESTAMP as MYSQL_TIMESTAMP
+from sqlalchemy import DDL
+from sqlalchemy import event
 
 # Database
 from config.db import meta
@@ -20,5 +24,23 @@ Tweet = Table(
     Column('content', String(255), nullable=False),
     Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False,),
     Column('created_at', TIMESTAMP, default=datetime.utcnow),
-    Column('updated_at', TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow),
+    # Microseconds on MySQL too, the ETags are derived from it
+    Column('updated_at', TIMESTAMP().with_variant(MYSQL_TIMESTAMP(fsp=6), 'mysql'),
+           default=datetime.utcnow, onupdate=datetime.utcnow),
+    # Keyset pagination of the newest tweets
+    Index('ix_tweets_created_at_id', 'created_at', 'id'),
+    # Keyset pagination of the tweets of a user
+    Index('ix_tweets_user_id_created_at_id', 'user_id', 'created_at', 'id'),
 )
+
+# Full-text index of the content: a FULLTEXT index on MySQL, an FTS5 table
+# keyed by tweet id on SQLite (kept in sync by utils.search). Databases
+# created before it get it from `python manage.py migrate`.
+FULLTEXT_INDEX = 'ix_tweets_content_fulltext'
+CREATE_FULLTEXT_INDEX = DDL(f'CREATE FULLTEXT INDEX {FULLTEXT_INDEX} ON tweets (content)')
+CREATE_SEARCH_TABLE = DDL('CREATE VIRTUAL TABLE IF NOT EXISTS tweets_fts USING fts5(content)')
+
+event.listen(Tweet, 'after_create', CREATE_FULLTEXT_INDEX.execute_if(dialect='mysql'))
+event.listen(Tweet, 'after_create', CREATE_SEARCH_TABLE.execute_if(dialect='sqlite'))
+event.listen(Tweet, 'before_drop', DDL(
+    'DROP TABLE IF EXISTS tweets_fts').execute_if(dialect='sqlite'))
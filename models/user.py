@@ -7,6 +7,8 @@ from sqlalchemy import Integer
 from sqlalchemy import String
 from sqlalchemy import TIMESTAMP
 from sqlalchemy import Date
+from sqlalchemy import Index
+from sqlalchemy.dialects.mysql import TIMESTAMP as MYSQL_TIMESTAMP
 
 
 # Database
@@ -17,11 +19,21 @@ User = Table(
     'users',
     meta,
     Column('id', Integer, primary_key=True, autoincrement=True),
-    Column('first_name', String(50), nullable=False),
-    Column('last_name', String(50), nullable=False),
+    # Case-insensitive on SQLite like the default MySQL collations, so the
+    # name indexes serve the prefix filters (LIKE is case-insensitive)
+    Column('first_name', String(50).with_variant(String(50, collation='NOCASE'), 'sqlite'), nullable=False),
+    Column('last_name', String(50).with_variant(String(50, collation='NOCASE'), 'sqlite'), nullable=False),
     Column('birth_date', Date, nullable=True),
     Column('email', String(120), unique=True, nullable=False),
     Column('password', String(255), nullable=False),
     Column('created_at', TIMESTAMP, default=datetime.utcnow),
-    Column('updated_at', TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow),
+    # Microseconds on MySQL too, the ETags are derived from it
+    Column('updated_at', TIMESTAMP().with_variant(MYSQL_TIMESTAMP(fsp=6), 'mysql'),
+           default=datetime.utcnow, onupdate=datetime.utcnow),
+    # Prefix search by name in id order, email is already indexed by its unique constraint
+    Index('ix_users_first_name_id', 'first_name', 'id'),
+    Index('ix_users_last_name_id', 'last_name', 'id'),
 )
+
+# Columns of the UserOut schema, everything but the password hash
+USER_PUBLIC_COLUMNS = [column for column in User.c if column.name != 'password']
@@ -5,10 +5,12 @@ from fastapi import APIRouter
 from fastapi import status
 from fastapi import Body
 from fastapi import HTTPException
+from fastapi import Depends
 from sqlalchemy.exc import IntegrityError
 
 # Database
-from config.db import connection
+from config.db import Database
+from config.db import get_db
 
 # Models
 from models.user import User
@@ -22,8 +24,8 @@ from schemas.auth import BaseJWTRefreshToken
 from schemas.auth import JWTAccessToken
 
 # Utils
-from utils.passwords import hash_password
-from utils.passwords import check_password
+from utils.passwords import hash_password_async
+from utils.passwords import check_password_async
 from utils.jsonwebtoken import create_credentials
 from utils.jsonwebtoken import create_access_token
 from utils.jsonwebtoken import verify_token
@@ -38,7 +40,10 @@ router = APIRouter()
              status_code=status.HTTP_201_CREATED,
              summary='Sign up',
              tags=['Auth', 'Users'])
-def signup(user: CreateUser = Body(...)):
+async def signup(
+    user: CreateUser = Body(...),
+    db: Database = Depends(get_db),
+):
     """Sign up route.
 
     This path operation registers a new user in the app.
@@ -56,10 +61,11 @@ def signup(user: CreateUser = Body(...)):
     """
 
     user_dict = user.dict()
-    user_dict['password'] = hash_password(user_dict['password'])
+    user_dict['password'] = await hash_password_async(user_dict['password'])
 
     try:
-        response = connection.execute(User.insert().values(**user_dict))
+        async with db.transaction():
+            response = await db.execute(User.insert().values(**user_dict))
     except IntegrityError as e:
         str_error = str(e)
         if 'Duplicate entry' in str_error and 'users.email' in str_error:
@@ -89,7 +95,10 @@ def signup(user: CreateUser = Body(...)):
           status_code=status.HTTP_200_OK,
           summary='Login',
           tags=['Auth', 'Users'])
-def login(user: LoginRequest = Body(...)):
+async def login(
+    user: LoginRequest = Body(...),
+    db: Database = Depends(get_db),
+):
     """Login route.
 
     This operation path allows a user to login in the app.
@@ -106,21 +115,21 @@ def login(user: LoginRequest = Body(...)):
     - refresh_token_expiration: **int**
     """
 
-    registed_user = connection.execute(User.select().where(User.c.email == user.email)).fetchone()
+    registed_user = await db.fetch_one(User.select().where(User.c.email == user.email))
 
     if registed_user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail='User not found')
 
 
-    password_match = check_password(user.password, registed_user.password)
+    password_match = await check_password_async(user.password, registed_user.password)
 
     if not password_match:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail='Invalid credentials')
 
     response = {
-        'user': UserOut(**registed_user),
+        'user': UserOut(**registed_user._mapping),
     }
     response.update(create_credentials(response['user']))
 
@@ -132,7 +141,10 @@ def login(user: LoginRequest = Body(...)):
              status_code=status.HTTP_200_OK,
              summary='Refresh token',
              tags=['Auth', 'Users'])
-def refresh_token(refresh_token: BaseJWTRefreshToken = Body(...)):
+async def refresh_token(
+    refresh_token: BaseJWTRefreshToken = Body(...),
+    db: Database = Depends(get_db),
+):
     """Refresh token route.
 
     This operation path allows a user to refresh the access token.
@@ -154,7 +166,7 @@ def refresh_token(refresh_token: BaseJWTRefreshToken = Body(...)):
     if decoded_token is None:
         raise base_exception
 
-    user = connection.execute(User.select().where(User.c.id == decoded_token['sub'])).fetchone()
+    user = await db.fetch_one(User.select().where(User.c.id == decoded_token['sub']))
 
     if user is None:
         raise base_exception
@@ -0,0 +1,26 @@
+# FastAPI
+from fastapi import APIRouter
+from fastapi import status
+from fastapi.responses import PlainTextResponse
+
+# Utils
+from utils.metrics import render
+
+
+router = APIRouter()
+
+
+@router.get('/metrics',
+            response_class=PlainTextResponse,
+            status_code=status.HTTP_200_OK,
+            summary='Get the metrics',
+            tags=['Metrics'],
+            include_in_schema=False)
+async def metrics():
+    """Metrics.
+
+    This operation path shows the request, database and password hashing
+    metrics of this process in the Prometheus text format.
+    """
+
+    return PlainTextResponse(render(), media_type='text/plain; version=0.0.4; charset=utf-8')
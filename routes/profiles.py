@@ -0,0 +1,87 @@
+from typing import List
+from typing import Optional
+
+# FastAPI
+from fastapi import APIRouter
+from fastapi import Depends
+from fastapi import Header
+from fastapi import HTTPException
+from fastapi import Path
+from fastapi import status
+from fastapi.responses import FileResponse
+
+# Schemas
+from schemas.profile import ProfileOut
+
+# Utils
+from utils.profiling import is_allowed
+from utils.profiling import list_profiles
+from utils.profiling import profile_path
+
+
+def profiling_access(x_profile: Optional[str] = Header(None,
+                                                       description='PROFILING_TOKEN, not needed in debug mode')):
+    """
+    Allow the profiles to be read in debug mode or with the profiling token.
+
+    Raises:
+        HTTPException: 403 otherwise.
+    """
+
+    if not is_allowed(x_profile):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail='Not allowed.')
+
+
+router = APIRouter(dependencies=[Depends(profiling_access)])
+
+
+@router.get('/profiles',
+            response_model=List[ProfileOut],
+            status_code=status.HTTP_200_OK,
+            summary='Get the saved profiles',
+            tags=['Debug'])
+async def list_request_profiles():
+    """List profiles.
+
+    This operation path shows the saved request profiles, newest first.
+
+    Returns a json list with, for each profile:
+    - name: **str**
+    - size: **int**
+    - created_at: **datetime**
+    """
+
+    return list_profiles()
+
+
+@router.get('/profiles/{name}',
+            response_class=FileResponse,
+            status_code=status.HTTP_200_OK,
+            summary='Get a saved profile',
+            tags=['Debug'])
+async def retrieve_request_profile(
+    name: str = Path(...,
+                     title='Profile name',
+                     example='20211101T120000-get-tweets-1f2e3d4c.prof'),
+):
+    """Retrieve a profile.
+
+    This operation path downloads a saved request profile. `.prof` files
+    are pstats dumps (snakeviz, `python -m pstats`), `.collapsed` files are
+    collapsed stacks for flamegraph.pl or speedscope.
+
+    Parameters:
+    - Path parameters:
+        - name: **str**
+
+    Returns the profile file.
+    """
+
+    path = profile_path(name)
+
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail='Profile not found.')
+
+    return FileResponse(path, media_type='application/octet-stream', filename=name)
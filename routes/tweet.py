@@ -1,51 +1,287 @@
+import json
+
+from typing import Any
+from typing import AsyncIterator
+from typing import Dict
 from typing import List
+from typing import Optional
+from datetime import date
 from datetime import datetime
 
-# PyDottie
-import pydottie  # type: ignore
-
 # SQLAlchemy
-from sqlalchemy import text
-
+from sqlalchemy import bindparam
+from sqlalchemy import select
 
 # FastAPI
 from fastapi import APIRouter
 from fastapi import HTTPException
+from fastapi import Request
 from fastapi import Response
 from fastapi import status
 from fastapi import Body
 from fastapi import Path
+from fastapi import Query
+from fastapi import Header
 from fastapi import Depends
+from fastapi.responses import StreamingResponse
 
 # Models
 from models import Tweet
+from models import User
 
 # Database
-from config.db import connection
+from config.db import Database
+from config.db import get_db
+from config.db import get_read_db
+from config.db import database
+from config.db import reads_from_replica
+
+# Settings
+from config.settings import PAGINATION_DEFAULT_LIMIT
+from config.settings import PAGINATION_MAX_LIMIT
+from config.settings import TWEETS_GROUP_COMMIT
+from config.settings import TWEETS_EXPORT_CHUNK_SIZE
 
 # Schemas
 from schemas.tweet import Tweet as TweetOut
 from schemas.tweet import TweetWithRelations
+from schemas.tweet import TweetPage
 from schemas.tweet import BaseTweet
+from schemas.tweet import CreateTweets
 from schemas.user import User as UserSchema
 
 # Middlewares
 from middleware.auth import get_current_user
 
+# Utils
+from utils.pagination import encode_cursor
+from utils.pagination import decode_cursor
+from utils.tweets import TWEETS_WITH_USER
+from utils.tweets import NEWEST_FIRST
+from utils.tweets import BEFORE_CURSOR
+from utils.tweets import tweet_with_user
+from utils.timelines import fan_out_tweet
+from utils.timelines import add_pull_author
+from utils.timelines import read_timeline
+from utils.search import search_tweets
+from utils.search import index_tweet
+from utils.search import unindex_tweet
+from utils.tweet_writes import insert_tweets
+from utils.tweet_writes import tweet_writes
+from utils.etag import make_etag
+from utils.etag import etag_matches
+from utils.etag import not_modified
+from utils.responses import fast_json
+
 router = APIRouter()
 
+LIST_TWEETS = TWEETS_WITH_USER.order_by(*NEWEST_FIRST).limit(bindparam('limit'))
+LIST_TWEETS_BEFORE_CURSOR = LIST_TWEETS.where(BEFORE_CURSOR)
+RETRIEVE_TWEET = TWEETS_WITH_USER.where(Tweet.c.id == bindparam('id'))
+# Oldest first, so an export resumed with `since` does not skip new tweets
+EXPORT_TWEETS = TWEETS_WITH_USER.order_by(Tweet.c.created_at, Tweet.c.id)
+EXPORT_TWEETS_SINCE = EXPORT_TWEETS.where(Tweet.c.created_at >= bindparam('since'))
+# Version of a tweet and its author, read by primary key to answer conditional
+# GETs without loading the content.
+RETRIEVE_TWEET_VERSION = select(Tweet.c.updated_at, User.c.updated_at).select_from(
+    Tweet.join(User, Tweet.c.user_id == User.c.id)).where(Tweet.c.id == bindparam('id'))
+
 
 @router.get('/',
-            response_model=List[TweetWithRelations],
+            response_model=TweetPage,
             status_code=status.HTTP_200_OK,
             summary='Get all tweets',
             tags=['Tweets'])
-def list_tweets():
+async def list_tweets(
+    limit: int = Query(PAGINATION_DEFAULT_LIMIT,
+                       ge=1,
+                       le=PAGINATION_MAX_LIMIT,
+                       description='Maximum number of tweets to return'),
+    cursor: Optional[str] = Query(None,
+                                  description='The `next_cursor` of the previous page'),
+    db: Database = Depends(get_read_db),
+):
     """List tweets.
 
-    This operation path shows all tweets in the app.
+    This operation path shows the tweets in the app, newest first.
 
-    Returns a json with the basic tweet information:
+    Parameters:
+    - Query parameters:
+        - limit: **int**
+        - cursor: **Optional[str]**
+
+    Returns a json with a page of tweets:
+    - items: **List[TweetWithRelations]**
+        - id: **int**
+        - content: **str**
+        - user: **UserOut**
+        - created_at: **datetime**
+        - updated_at: **datetime**
+    - next_cursor: **Optional[str]**
+    """
+
+    parameters = {'limit': limit + 1}
+    query = LIST_TWEETS
+
+    if cursor is not None:
+        parameters['created_at'], parameters['id'] = decode_cursor(cursor, datetime, int)
+        query = LIST_TWEETS_BEFORE_CURSOR
+
+    response = await db.fetch_all(query, parameters)
+
+    output = [tweet_with_user(record) for record in response[:limit]]
+
+    next_cursor = None
+    if len(response) > limit:
+        next_cursor = encode_cursor(output[-1]['created_at'], output[-1]['id'])
+
+    return fast_json({
+        'items': output,
+        'next_cursor': next_cursor,
+    })
+
+
+@router.get('/timeline',
+            response_model=TweetPage,
+            status_code=status.HTTP_200_OK,
+            summary='Get the home timeline',
+            tags=['Tweets'])
+async def home_timeline(
+    limit: int = Query(PAGINATION_DEFAULT_LIMIT,
+                       ge=1,
+                       le=PAGINATION_MAX_LIMIT,
+                       description='Maximum number of tweets to return'),
+    cursor: Optional[str] = Query(None,
+                                  description='The `next_cursor` of the previous page'),
+    request_user: UserSchema = Depends(get_current_user),
+    db: Database = Depends(get_read_db),
+):
+    """Home timeline.
+
+    This operation path shows the tweets of the current user and the users
+    they follow, newest first.
+
+    Parameters:
+    - Query parameters:
+        - limit: **int**
+        - cursor: **Optional[str]**
+
+    Returns a json with a page of tweets:
+    - items: **List[TweetWithRelations]**
+    - next_cursor: **Optional[str]**
+    """
+
+    keyset = None
+    if cursor is not None:
+        keyset = tuple(decode_cursor(cursor, datetime, int))
+
+    output = await read_timeline(db, request_user.id, limit + 1, keyset)
+
+    next_cursor = None
+    if len(output) > limit:
+        output = output[:limit]
+        next_cursor = encode_cursor(output[-1]['created_at'], output[-1]['id'])
+
+    return fast_json({
+        'items': output,
+        'next_cursor': next_cursor,
+    })
+
+
+@router.get('/search',
+            response_model=TweetPage,
+            status_code=status.HTTP_200_OK,
+            summary='Search tweets',
+            tags=['Tweets'])
+async def search(
+    q: str = Query(...,
+                   min_length=1,
+                   max_length=256,
+                   description='Words to search in the tweets content'),
+    limit: int = Query(PAGINATION_DEFAULT_LIMIT,
+                       ge=1,
+                       le=PAGINATION_MAX_LIMIT,
+                       description='Maximum number of tweets to return'),
+    cursor: Optional[str] = Query(None,
+                                  description='The `next_cursor` of the previous page'),
+    db: Database = Depends(get_read_db),
+):
+    """Search tweets.
+
+    This operation path searches the content of the tweets using the full-text
+    index, best matches first.
+
+    Parameters:
+    - Query parameters:
+        - q: **str**
+        - limit: **int**
+        - cursor: **Optional[str]**
+
+    Returns a json with a page of tweets:
+    - items: **List[TweetWithRelations]**
+    - next_cursor: **Optional[str]**
+    """
+
+    offset = 0
+    if cursor is not None:
+        offset, = decode_cursor(cursor, int)
+
+        if offset < 0:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail='Invalid cursor.')
+
+    output = await search_tweets(db, q, limit + 1, offset)
+
+    next_cursor = None
+    if len(output) > limit:
+        output = output[:limit]
+        next_cursor = encode_cursor(offset + limit)
+
+    return fast_json({
+        'items': output,
+        'next_cursor': next_cursor,
+    })
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+async def _export_tweets(query: Any, parameters: Dict[str, Any], read_only: bool) -> AsyncIterator[bytes]:
+    # Runs after the endpoint returned, so it checks out its own connection
+    async with database(read_only=read_only) as db:
+        async for rows in db.stream(query, parameters, TWEETS_EXPORT_CHUNK_SIZE):
+            yield ''.join(json.dumps(tweet_with_user(row), default=_json_default) + '\n'
+                          for row in rows).encode('utf-8')
+
+
+@router.get('/export',
+            response_class=StreamingResponse,
+            status_code=status.HTTP_200_OK,
+            summary='Export all tweets',
+            tags=['Tweets'])
+async def export_tweets(
+    request: Request,
+    since: Optional[datetime] = Query(None,
+                                      description='Only export the tweets created at or after this time'),
+):
+    """Export tweets.
+
+    This path operation streams every tweet as newline delimited json, oldest
+    first. Rows are read with a server-side cursor and sent in chunks, so the
+    export never holds the whole table in memory.
+
+    For incremental exports, pass the `created_at` of the last exported tweet
+    as `since`, tweets created at that exact time are exported again.
+
+    Parameters:
+    - Query parameters:
+        - since: **Optional[datetime]**
+
+    Returns one json object per line, with the tweet information:
     - id: **int**
     - content: **str**
     - user: **UserOut**
@@ -53,35 +289,14 @@ def list_tweets():
     - updated_at: **datetime**
     """
 
-    # TODO: Change the raw query to a SQLAlchemy query
-    query = """
-    SELECT
-        t.id as 'id',
-        t.content as 'content',
-        t.created_at as 'created_at',
-        t.updated_at as 'updated_at',
-        u.id as 'user.id',
-        u.first_name as 'user.first_name',
-        u.last_name as 'user.last_name',
-        u.birth_date as 'user.birth_date',
-        u.email as 'user.email',
-        u.created_at as 'user.created_at',
-        u.updated_at as 'user.updated_at'
-    FROM
-        tweets as t
-    INNER JOIN
-        users as u
-    ON
-        t.user_id = u.id;
-    """
-
-    response = connection.execute(text(query)).fetchall()
+    read_only = reads_from_replica(request)
 
-    output = []
-    for record in response:
-        output.append(pydottie.transform(record))
+    if since is None:
+        body = _export_tweets(EXPORT_TWEETS, {}, read_only)
+    else:
+        body = _export_tweets(EXPORT_TWEETS_SINCE, {'since': since}, read_only)
 
-    return output
+    return StreamingResponse(body, media_type='application/x-ndjson')
 
 
 @router.get('/{id}',
@@ -89,16 +304,26 @@ def list_tweets():
             status_code=status.HTTP_200_OK,
             summary='Get a tweet',
             tags=['Tweets'])
-def retrieve_tweet(
+async def retrieve_tweet(
+    response: Response,
     id: int = Path(...,
                    title='Tweet ID',
                    description='The ID of the tweet to retrieve'),
+    if_none_match: Optional[str] = Header(None,
+                                          description='ETag of the cached tweet'),
+    db: Database = Depends(get_read_db),
 ):
     """Retreive tweet.
 
+    The response carries an `ETag` that changes when the tweet or its author
+    are updated. Sending it back in `If-None-Match` returns an empty 304 if
+    the tweet did not change.
+
     Parameters:
     - Path parameters:
         - id: **str**
+    - Headers:
+        - If-None-Match: **Optional[str]**
 
     Returns a json with the tweet information:
     - id: **int**
@@ -108,37 +333,25 @@ def retrieve_tweet(
     - updated_at: **datetime**
     """
 
-    query = """
-    SELECT
-        t.id as 'id',
-        t.content as 'content',
-        t.created_at as 'created_at',
-        t.updated_at as 'updated_at',
-        u.id as 'user.id',
-        u.first_name as 'user.first_name',
-        u.last_name as 'user.last_name',
-        u.birth_date as 'user.birth_date',
-        u.email as 'user.email',
-        u.created_at as 'user.created_at',
-        u.updated_at as 'user.updated_at'
-    FROM
-        tweets as t
-    INNER JOIN
-        users as u
-    ON
-        t.user_id = u.id
-    WHERE
-        t.id = :id
-    ;
-    """
+    if if_none_match is not None:
+        version = await db.fetch_one(RETRIEVE_TWEET_VERSION, {'id': id})
+
+        if version is not None:
+            etag = make_etag('tweet', id, *version)
 
-    tweet = connection.execute(text(query), id=id).fetchone()
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+    tweet = await db.fetch_one(RETRIEVE_TWEET, {'id': id})
 
     if not tweet:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail='Tweet not found')
 
-    return pydottie.transform(tweet)
+    output = tweet_with_user(tweet)
+    response.headers['ETag'] = make_etag('tweet', id, output['updated_at'], output['user']['updated_at'])
+
+    return output
 
 
 @router.post('/',
@@ -146,9 +359,10 @@ def retrieve_tweet(
           status_code=status.HTTP_200_OK,
           summary='Create a new tweet',
           tags=['Tweets'])
-def create_tweet(
+async def create_tweet(
     tweet: BaseTweet = Body(...),
     request_user: UserSchema = Depends(get_current_user),
+    db: Database = Depends(get_db),
 ):
     """Creates a tweet.
 
@@ -169,31 +383,93 @@ def create_tweet(
     # Create tweet
     tweet_dict = tweet.dict()
     tweet_dict['user_id'] = request_user.id
+    tweet_dict['created_at'] = datetime.utcnow()
+    tweet_dict['updated_at'] = tweet_dict['created_at']
 
-    response = connection.execute(Tweet.insert().values(**tweet_dict))
+    if TWEETS_GROUP_COMMIT:
+        # Do not hold a connection while the batch fills up
+        await db.close()
+        tweet_dict['id'] = await tweet_writes.insert(tweet_dict)
+        return tweet_dict
 
-    if response is None or (response.rowcount == 0):
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                            detail='Something went wrong.')
+    async with db.transaction():
+        response = await db.execute(Tweet.insert().values(**tweet_dict))
 
-    tweet_dict['id'] = response.lastrowid
-    tweet_dict['created_at'] = datetime.utcnow()
-    tweet_dict['updated_at'] = tweet_dict['created_at']
+        if response is None or (response.rowcount == 0):
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                                detail='Something went wrong.')
+
+        tweet_dict['id'] = response.lastrowid
+
+        await index_tweet(db, tweet_dict['id'], tweet_dict['content'])
+
+        fanned_out = await fan_out_tweet(db, tweet_dict['id'], request_user.id, tweet_dict['created_at'])
+
+    if not fanned_out:
+        await add_pull_author(db, request_user.id)
 
     return tweet_dict
 
 
+@router.post('/batch',
+             response_model=List[TweetOut],
+             status_code=status.HTTP_200_OK,
+             summary='Create several tweets',
+             tags=['Tweets'])
+async def create_tweets(
+    tweets: CreateTweets = Body(...),
+    request_user: UserSchema = Depends(get_current_user),
+    db: Database = Depends(get_db),
+):
+    """Creates several tweets.
+
+    This path operation creates up to `TWEETS_BATCH_MAX_SIZE` tweets of the
+    current user at once, with a single insert. Either all the tweets are
+    created or none.
+
+    Parameters:
+    - Request body parameters:
+        - tweets: **CreateTweets**
+            - items: **List[BaseTweet]**
+
+    Returns a json list with the basic information of the created tweets,
+    in the order of the request:
+    - id: **int**
+    - content: **str**
+    - created_at: **datetime**
+    - updated_at: **datetime**
+    - user_id: **int**
+    """
+
+    created_at = datetime.utcnow()
+    tweets_list = [{
+        **tweet.dict(),
+        'user_id': request_user.id,
+        'created_at': created_at,
+        'updated_at': created_at,
+    } for tweet in tweets.items]
+
+    async with db.transaction():
+        pull_authors = await insert_tweets(db, tweets_list)
+
+    for author_id in pull_authors:
+        await add_pull_author(db, author_id)
+
+    return tweets_list
+
+
 @router.put('/{id}',
          response_model=TweetWithRelations,
          status_code=status.HTTP_200_OK,
          summary='Update tweet',
          tags=['Tweets'])
-def update_tweet(
+async def update_tweet(
     id: str = Path(...,
                    title='Tweet ID',
                    description='The ID of the tweet to update'),
     tweet: BaseTweet = Body(...),
     request_user: UserSchema = Depends(get_current_user),
+    db: Database = Depends(get_db),
 ):
     """Update tweet.
 
@@ -213,7 +489,7 @@ def update_tweet(
     - user: **UserOut**
     """
 
-    tweet_response = connection.execute(Tweet.select().where(Tweet.c.id == id)).fetchone()
+    tweet_response = await db.fetch_one(Tweet.select().where(Tweet.c.id == id))
 
     if tweet_response is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
@@ -223,10 +499,14 @@ def update_tweet(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                             detail='You are not allowed to update this tweet')
 
-    connection.execute(Tweet.update().where(Tweet.c.id == id).values(**tweet.dict()))
-
-    tweet_dict = {**tweet_response}
+    tweet_dict = {**tweet_response._mapping, **tweet.dict()}
     tweet_dict['updated_at'] = datetime.utcnow()
+
+    async with db.transaction():
+        await db.execute(Tweet.update().where(Tweet.c.id == id).values(
+            content=tweet_dict['content'], updated_at=tweet_dict['updated_at']))
+        await index_tweet(db, tweet_response.id, tweet.content)
+
     tweet_dict['user'] = request_user
 
     return tweet_dict
@@ -236,12 +516,13 @@ def update_tweet(
             status_code=status.HTTP_204_NO_CONTENT,
             summary='Delete tweet',
             tags=['Tweets'])
-def delete_tweet(
+async def delete_tweet(
     id: int = Path(...,
                    gt=0,
                    title='Tweet ID',
                    description='The ID of the tweet to delete'),
     request_user: UserSchema = Depends(get_current_user),
+    db: Database = Depends(get_db),
 ):
     """Delete tweet.
 
@@ -254,7 +535,7 @@ def delete_tweet(
         - tweet: **BaseTweet**
     """
 
-    tweet_response = connection.execute(Tweet.select().where(Tweet.c.id == id)).fetchone()
+    tweet_response = await db.fetch_one(Tweet.select().where(Tweet.c.id == id))
 
     if tweet_response is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
@@ -264,6 +545,8 @@ def delete_tweet(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                             detail='You are not allowed to delete this tweet')
 
-    connection.execute(Tweet.delete().where(Tweet.c.id == id))
+    async with db.transaction():
+        await db.execute(Tweet.delete().where(Tweet.c.id == id))
+        await unindex_tweet(db, id)
 
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Optional
 from datetime import datetime
 
 # FastAPI
@@ -8,52 +8,145 @@ from fastapi import HTTPException
 from fastapi import Response
 from fastapi import Body
 from fastapi import Path
+from fastapi import Query
+from fastapi import Header
 from fastapi import Depends
+
+# SQLAlchemy
+from sqlalchemy import select
+from sqlalchemy import union
+from sqlalchemy import bindparam
 from sqlalchemy.exc import IntegrityError
 
 # Database
-from config.db import connection
+from config.db import Database
+from config.db import get_db
+from config.db import get_read_db
+
+# Settings
+from config.settings import PAGINATION_DEFAULT_LIMIT
+from config.settings import PAGINATION_MAX_LIMIT
 
 # Middlewares
 from middleware.auth import get_current_user
+from middleware.auth import principal_cache
 
 # Models
 from models.user import User
+from models.user import USER_PUBLIC_COLUMNS
+from models.follow import Follow
+from models.timeline import Timeline
 
 # Schemas
 from schemas.user import CreateUser
 from schemas.user import UserOut
+from schemas.user import UserPage
 from schemas.user import User as UserSchema
+from schemas.tweet import UserTweetsPage
 
 # Utils
-from utils.passwords import hash_password
+from utils.passwords import hash_password_async
+from utils.pagination import encode_cursor
+from utils.pagination import decode_cursor
+from utils.timelines import backfill_timeline
+from utils.tweets import USER_TWEETS
+from utils.tweets import NEWEST_FIRST
+from utils.tweets import BEFORE_CURSOR
+from utils.tweets import user_tweet
+from utils.tweets import user_out
+from utils.etag import make_etag
+from utils.etag import etag_matches
+from utils.etag import not_modified
+from utils.responses import fast_json
 
 
 router = APIRouter()
 
+RETRIEVE_USER = select(*USER_PUBLIC_COLUMNS).where(User.c.id == bindparam('id'))
+RETRIEVE_USER_VERSION = select(User.c.updated_at).where(User.c.id == bindparam('id'))
+LIST_USER_TWEETS = USER_TWEETS.order_by(*NEWEST_FIRST).limit(bindparam('limit'))
+LIST_USER_TWEETS_BEFORE_CURSOR = LIST_USER_TWEETS.where(BEFORE_CURSOR)
+
+
+def _prefix_pattern(prefix: str) -> str:
+    # Bound as a whole, SQLite only runs a LIKE on an index for a constant pattern
+    return prefix.replace('/', '//').replace('%', '/%').replace('_', '/_') + '%'
+
 
 @router.get('/users/',
-         response_model=List[UserOut],
+         response_model=UserPage,
          status_code=status.HTTP_200_OK,
          summary='Get all users',
          tags=['Users'])
-def list_users():
+async def list_users(
+    limit: int = Query(PAGINATION_DEFAULT_LIMIT,
+                       ge=1,
+                       le=PAGINATION_MAX_LIMIT,
+                       description='Maximum number of users to return'),
+    cursor: Optional[str] = Query(None,
+                                  description='The `next_cursor` of the previous page'),
+    name: Optional[str] = Query(None,
+                                min_length=1,
+                                max_length=50,
+                                description='Prefix of the first or last name'),
+    email: Optional[str] = Query(None,
+                                 min_length=1,
+                                 max_length=120,
+                                 description='Prefix of the email'),
+    db: Database = Depends(get_read_db),
+):
     """List all users.
 
-    This path operation shows all users in the app.
+    This path operation shows the users in the app ordered by id.
 
-    Returns a json object with the information of all users.
-    - id: **int**
-    - first_name: **str**
-    - last_name: **str**
-    - email: **EmailStr**
-    - created_at: **datetime**
-    - updated_at: **datetime**
+    Parameters:
+    - Query parameters:
+        - limit: **int**
+        - cursor: **Optional[str]**
+        - name: **Optional[str]**
+        - email: **Optional[str]**
+
+    Returns a json object with a page of users.
+    - items: **List[UserOut]**
+        - id: **int**
+        - first_name: **str**
+        - last_name: **str**
+        - email: **EmailStr**
+        - created_at: **datetime**
+        - updated_at: **datetime**
+    - next_cursor: **Optional[str]**
     """
 
-    response = connection.execute(User.select()).fetchall()
+    query = select(*USER_PUBLIC_COLUMNS)
+
+    if cursor is not None:
+        last_id, = decode_cursor(cursor, int)
+        query = query.where(User.c.id > last_id)
+
+    if email is not None:
+        query = query.where(User.c.email.like(_prefix_pattern(email), escape='/'))
+
+    if name is not None:
+        # A branch per name index instead of an OR, which scans the table
+        pattern = _prefix_pattern(name)
+        users = union(query.where(User.c.first_name.like(pattern, escape='/')),
+                      query.where(User.c.last_name.like(pattern, escape='/'))).subquery()
+        query = select(users).order_by(users.c.id).limit(limit + 1)
+    else:
+        query = query.order_by(User.c.id).limit(limit + 1)
+
+    response = await db.fetch_all(query)
 
-    return response
+    output = [user_out(record) for record in response[:limit]]
+
+    next_cursor = None
+    if len(response) > limit:
+        next_cursor = encode_cursor(output[-1]['id'])
+
+    return fast_json({
+        'items': output,
+        'next_cursor': next_cursor,
+    })
 
 
 @router.get('/users/{id}',
@@ -61,19 +154,29 @@ def list_users():
          status_code=status.HTTP_200_OK,
          summary='Get a user',
          tags=['Users'])
-def retrieve_user(
+async def retrieve_user(
+    response: Response,
     id: int = Path(...,
                    gt=0,
                    title='User ID',
                    description='ID of the user to retrieve'),
+    if_none_match: Optional[str] = Header(None,
+                                          description='ETag of the cached user'),
+    db: Database = Depends(get_read_db),
 ):
     """Retrieve user.
 
     This path operation allows to get the information of a specific user.
 
+    The response carries an `ETag` that changes when the user is updated.
+    Sending it back in `If-None-Match` returns an empty 304 if the user did
+    not change.
+
     Parameters:
     - Path parameters:
         - id: **int**
+    - Headers:
+        - If-None-Match: **Optional[str]**
 
     Returns a json object with the information of the user.
     - id: **int**
@@ -84,13 +187,93 @@ def retrieve_user(
     - updated_at: **datetime**
     """
 
-    response = connection.execute(User.select().where(User.c.id == id)).fetchone()
+    if if_none_match is not None:
+        version = await db.fetch_one(RETRIEVE_USER_VERSION, {'id': id})
+
+        if version is not None:
+            etag = make_etag('user', id, *version)
+
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+    user_response = await db.fetch_one(RETRIEVE_USER, {'id': id})
+
+    if user_response is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail='User not found')
+
+    output = user_response._mapping
+    response.headers['ETag'] = make_etag('user', id, output['updated_at'])
+
+    return output
+
+
+@router.get('/users/{id}/tweets',
+         response_model=UserTweetsPage,
+         status_code=status.HTTP_200_OK,
+         summary='Get the tweets of a user',
+         tags=['Users', 'Tweets'])
+async def list_user_tweets(
+    id: int = Path(...,
+                   gt=0,
+                   title='User ID',
+                   description='ID of the user whose tweets are listed'),
+    limit: int = Query(PAGINATION_DEFAULT_LIMIT,
+                       ge=1,
+                       le=PAGINATION_MAX_LIMIT,
+                       description='Maximum number of tweets to return'),
+    cursor: Optional[str] = Query(None,
+                                  description='The `next_cursor` of the previous page'),
+    db: Database = Depends(get_read_db),
+):
+    """List user tweets.
+
+    This path operation shows the tweets of a specific user, newest first.
+
+    Parameters:
+    - Path parameters:
+        - id: **int**
+    - Query parameters:
+        - limit: **int**
+        - cursor: **Optional[str]**
+
+    Returns a json object with the user and a page of their tweets.
+    - user: **UserOut**
+    - items: **List[Tweet]**
+        - id: **int**
+        - content: **str**
+        - user_id: **int**
+        - created_at: **datetime**
+        - updated_at: **datetime**
+    - next_cursor: **Optional[str]**
+    """
+
+    user_response = await db.fetch_one(RETRIEVE_USER, {'id': id})
 
-    if response is None:
+    if user_response is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail='User not found')
 
-    return response
+    parameters = {'user_id': id, 'limit': limit + 1}
+    query = LIST_USER_TWEETS
+
+    if cursor is not None:
+        parameters['created_at'], parameters['id'] = decode_cursor(cursor, datetime, int)
+        query = LIST_USER_TWEETS_BEFORE_CURSOR
+
+    response = await db.fetch_all(query, parameters)
+
+    output = [user_tweet(record) for record in response[:limit]]
+
+    next_cursor = None
+    if len(response) > limit:
+        next_cursor = encode_cursor(output[-1]['created_at'], output[-1]['id'])
+
+    return fast_json({
+        'user': user_out(user_response),
+        'items': output,
+        'next_cursor': next_cursor,
+    })
 
 
 @router.put('/users/{id}',
@@ -98,13 +281,14 @@ def retrieve_user(
          status_code=status.HTTP_200_OK,
          summary='Update user',
          tags=['Users'])
-def update_user(
+async def update_user(
     id: int = Path(...,
                    gt=0,
                    title='User ID',
                    description='ID of the user to update'),
     user: CreateUser = Body(...,),
     request_user: UserSchema = Depends(get_current_user),
+    db: Database = Depends(get_db),
 ):
     """Update user.
 
@@ -128,7 +312,7 @@ def update_user(
     - updated_at: **datetime**
     """
 
-    user_response = connection.execute(User.select().where(User.c.id == id)).fetchone()
+    user_response = await db.fetch_one(User.select().where(User.c.id == id))
 
     if user_response is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
@@ -140,15 +324,17 @@ def update_user(
 
     # Update user
     updated_user = {
-        **user_response,
+        **user_response._mapping,
         **user.dict(),
     }
 
-    updated_user['password'] = hash_password(updated_user['password'])
+    updated_user['password'] = await hash_password_async(updated_user['password'])
+    updated_user['updated_at'] = datetime.utcnow()
 
     # Save user
     try:
-        connection.execute(User.update(User.c.id == id).values(**updated_user))
+        async with db.transaction():
+            await db.execute(User.update(User.c.id == id).values(**updated_user))
     except IntegrityError as e:
         str_error = str(e)
         if 'Duplicate entry' in str_error and 'users.email' in str_error:
@@ -160,7 +346,7 @@ def update_user(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail='Internal server error.') from e
 
-    updated_user['updated_at'] = str(datetime.now())
+    principal_cache.delete(id)
 
     return updated_user
 
@@ -169,12 +355,13 @@ def update_user(
                status_code=status.HTTP_204_NO_CONTENT,
                summary='Delete user',
                tags=['Users'])
-def delete_user(
+async def delete_user(
     id: int = Path(...,
                    gt=0,
                    title='User ID',
                    description='ID of the user to delete'),
     request_user: UserSchema = Depends(get_current_user),
+    db: Database = Depends(get_db),
 ):
     """Delete user.
 
@@ -187,7 +374,7 @@ def delete_user(
         - id: **str**
     """
 
-    user_response = connection.execute(User.select().where(User.c.id == id)).fetchone()
+    user_response = await db.fetch_one(User.select().where(User.c.id == id))
 
     if user_response is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
@@ -198,6 +385,85 @@ def delete_user(
                             detail='You are not allowed to perform this action')
 
     # Delete user
-    connection.execute(User.delete().where(User.c.id == id))
+    async with db.transaction():
+        await db.execute(User.delete().where(User.c.id == id))
+
+    principal_cache.delete(id)
+
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post('/users/{id}/follow',
+             status_code=status.HTTP_204_NO_CONTENT,
+             summary='Follow user',
+             tags=['Users'])
+async def follow_user(
+    id: int = Path(...,
+                   gt=0,
+                   title='User ID',
+                   description='ID of the user to follow'),
+    request_user: UserSchema = Depends(get_current_user),
+    db: Database = Depends(get_db),
+):
+    """Follow user.
+
+    This path operation makes the current user follow a specific user, their
+    latest tweets are added to the home timeline.
+
+    Following a user twice has no effect.
+
+    Parameters:
+    - Path parameters:
+        - id: **int**
+    """
+
+    if id == request_user.id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail='You can not follow yourself')
+
+    user_response = await db.fetch_one(select(User.c.id).where(User.c.id == id))
+
+    if user_response is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail='User not found')
+
+    try:
+        async with db.transaction():
+            await db.execute(Follow.insert().values(follower_id=request_user.id, followee_id=id))
+            await backfill_timeline(db, request_user.id, id)
+    except IntegrityError:
+        # Already following
+        pass
+
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.delete('/users/{id}/follow',
+               status_code=status.HTTP_204_NO_CONTENT,
+               summary='Unfollow user',
+               tags=['Users'])
+async def unfollow_user(
+    id: int = Path(...,
+                   gt=0,
+                   title='User ID',
+                   description='ID of the user to unfollow'),
+    request_user: UserSchema = Depends(get_current_user),
+    db: Database = Depends(get_db),
+):
+    """Unfollow user.
+
+    This path operation makes the current user stop following a specific
+    user, their tweets are removed from the home timeline.
+
+    Parameters:
+    - Path parameters:
+        - id: **int**
+    """
+
+    async with db.transaction():
+        await db.execute(Follow.delete().where(Follow.c.follower_id == request_user.id,
+                                               Follow.c.followee_id == id))
+        await db.execute(Timeline.delete().where(Timeline.c.user_id == request_user.id,
+                                                 Timeline.c.author_id == id))
 
     return Response(status_code=status.HTTP_204_NO_CONTENT)
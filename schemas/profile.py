@@ -0,0 +1,16 @@
+from datetime import datetime
+
+# Pydantic
+from pydantic import BaseModel
+from pydantic import Field
+
+
+class ProfileOut(BaseModel):
+    name: str = Field(...,
+                      title='Profile name',
+                      example='20211101T120000-get-tweets-1f2e3d4c.prof',)
+    size: int = Field(...,
+                      ge=0,
+                      title='Size in bytes',)
+    created_at: datetime = Field(...,
+                                 title='When the profile was saved',)
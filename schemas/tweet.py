@@ -1,3 +1,5 @@
+from typing import List
+
 # Pydantic
 from pydantic import BaseModel
 from pydantic import Field
@@ -5,9 +7,13 @@ from pydantic import Field
 # Models
 from schemas.user import UserOut
 
+# Settings
+from config.settings import TWEETS_BATCH_MAX_SIZE
+
 # Mixins
 from mixins.models import IDMixin
 from mixins.models import TimestampMixin
+from mixins.models import CursorPaginationMixin
 
 
 
@@ -34,5 +40,28 @@ class TweetWithRelations(IDMixin, TimestampMixin, BaseTweet):
                        title='User who created the tweet',)
 
 
+class TweetPage(CursorPaginationMixin):
+
+    items: List[TweetWithRelations] = Field(...,
+                                            title='Tweets of the page',)
+
+
+class UserTweetsPage(CursorPaginationMixin):
+
+    user: UserOut = Field(...,
+                          title='User who created the tweets',)
+
+    items: List[Tweet] = Field(...,
+                               title='Tweets of the page',)
+
+
 class RegisterTweet(TweetUserID, BaseTweet):
     pass
+
+
+class CreateTweets(BaseModel):
+
+    items: List[BaseTweet] = Field(...,
+                                   min_items=1,
+                                   max_items=TWEETS_BATCH_MAX_SIZE,
+                                   title='Tweets to create',)
@@ -1,4 +1,5 @@
 from datetime import date
+from typing import List
 from typing import Optional
 
 # Pydantic
@@ -10,6 +11,7 @@ from pydantic import EmailStr
 # Mixins
 from mixins.models import IDMixin
 from mixins.models import TimestampMixin
+from mixins.models import CursorPaginationMixin
 
 
 class PasswordMixin(BaseModel):
@@ -44,6 +46,12 @@ class UserOut(IDMixin, TimestampMixin, BaseUser):
     pass
 
 
+class UserPage(CursorPaginationMixin):
+
+    items: List[UserOut] = Field(...,
+                                 title='Users of the page',)
+
+
 class User(PasswordMixin, UserOut):
     pass
 
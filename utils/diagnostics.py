@@ -0,0 +1,127 @@
+import logging
+
+from contextvars import ContextVar
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+# Settings
+from config.settings import METRICS_ENABLED
+from config.settings import DATABASE_SLOW_QUERY_MS
+from config.settings import DATABASE_N_PLUS_ONE_THRESHOLD
+
+# Utils
+from utils.metrics import DB_QUERY_DURATION
+
+
+logger = logging.getLogger(__name__)
+
+MAX_LOGGED_PARAMETERS = 500
+
+
+class RequestQueries:
+    """
+    Statements executed while handling a request.
+    """
+
+    __slots__ = ('count', 'seconds', 'statements')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        # Executions of each statement, by its SQL with placeholders
+        self.statements: Dict[str, int] = {}
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """
+        Get the statements executed at least `threshold` times, suspected N+1 queries.
+
+        Args:
+            threshold (int): Minimum number of executions.
+
+        Returns:
+            List[Tuple[str, int]]: The statements and their executions, most executed first.
+        """
+
+        repeated = [(statement, count) for statement, count in self.statements.items() if count >= threshold]
+
+        return sorted(repeated, key=lambda item: item[1], reverse=True)
+
+
+_request_queries: ContextVar[Optional[RequestQueries]] = ContextVar('request_queries', default=None)
+
+
+def track_request_queries() -> RequestQueries:
+    """
+    Start recording the statements of the current request.
+
+    The record is shared with the threadpool workers and tasks started by the
+    request, which run with a copy of its context.
+
+    Returns:
+        RequestQueries: The record, updated in place.
+    """
+
+    queries = RequestQueries()
+    _request_queries.set(queries)
+
+    return queries
+
+
+def request_queries() -> Optional[RequestQueries]:
+    """
+    Get the statements of the current request.
+
+    Returns:
+        Optional[RequestQueries]: The record, None outside of a request.
+    """
+
+    return _request_queries.get()
+
+
+def record_query(statement: str, parameters: Any, duration: float) -> None:
+    """
+    Record a statement executed by the database.
+
+    Statements slower than DATABASE_SLOW_QUERY_MS are logged with their
+    parameters.
+
+    Args:
+        statement (str): The SQL sent to the database.
+        parameters (Any): The bound parameters.
+        duration (float): The statement latency in seconds.
+    """
+
+    if METRICS_ENABLED:
+        DB_QUERY_DURATION.observe(duration)
+
+    queries = _request_queries.get()
+
+    if queries is not None:
+        queries.count += 1
+        queries.seconds += duration
+        queries.statements[statement] = queries.statements.get(statement, 0) + 1
+
+    if DATABASE_SLOW_QUERY_MS and duration * 1000 >= DATABASE_SLOW_QUERY_MS:
+        logger.warning('Slow query (%.1f ms): %s parameters=%.*r',
+                       duration * 1000, statement, MAX_LOGGED_PARAMETERS, parameters)
+
+
+def check_n_plus_one(queries: RequestQueries, method: str, path: str) -> None:
+    """
+    Log the statements repeated more than DATABASE_N_PLUS_ONE_THRESHOLD
+    times by a request.
+
+    Args:
+        queries (RequestQueries): The statements of the request.
+        method (str): The request method.
+        path (str): The request path.
+    """
+
+    if not DATABASE_N_PLUS_ONE_THRESHOLD:
+        return
+
+    for statement, count in queries.repeated(DATABASE_N_PLUS_ONE_THRESHOLD):
+        logger.warning('Suspected N+1 on %s %s, %d executions of: %s', method, path, count, statement)
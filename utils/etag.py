@@ -0,0 +1,66 @@
+from hashlib import sha1
+from datetime import datetime
+from typing import Any
+from typing import Optional
+
+# FastAPI
+from fastapi import Response
+from fastapi import status
+
+
+def make_etag(*values: Any) -> str:
+    """
+    Build a strong ETag from the values identifying a version of a resource.
+
+    Args:
+        *values (Any): The version values, usually the kind, id and `updated_at`.
+
+    Returns:
+        str: The quoted ETag.
+    """
+
+    version = '|'.join(value.isoformat() if isinstance(value, datetime) else str(value)
+                       for value in values)
+
+    return f'"{sha1(version.encode("utf-8")).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an `If-None-Match` header against the current ETag.
+
+    The comparison is weak as required for `If-None-Match`, so a `W/` prefix
+    sent by a proxy still matches.
+
+    Args:
+        if_none_match (Optional[str]): The header value.
+        etag (str): The current ETag.
+
+    Returns:
+        bool: True if the client already has the current version.
+    """
+
+    if not if_none_match:
+        return False
+
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+
+        if candidate == '*' or candidate.removeprefix('W/') == etag:
+            return True
+
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    """
+    Build the empty 304 response of a conditional GET.
+
+    Args:
+        etag (str): The current ETag.
+
+    Returns:
+        Response: The response.
+    """
+
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
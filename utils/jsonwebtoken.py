@@ -1,15 +1,24 @@
 import jwt
+import time
+import hashlib
 
 from typing import Tuple
 from typing import Union
 from typing import Any
 from typing import Dict
+from typing import Optional
 from datetime import datetime
 from datetime import timedelta
 
 from config import settings
 from schemas.user import UserOut
 from utils.user import get_fullname
+from utils.cache import TTLCache
+
+
+# Verified payloads by token digest, each entry lives until its token expires
+_verified_tokens = TTLCache(maxsize=settings.JWT_VERIFIED_CACHE_SIZE,
+                            ttl=settings.JWT_ACCESS_TOKEN_EXPIRATION * 60)
 
 
 def create_access_token(data: dict) -> Tuple[str, float]:
@@ -120,3 +129,55 @@ def verify_token(token: str) -> Union[Dict[str, Any], None]:
         return None
 
     return payload
+
+
+def verify_token_cached(token: str) -> Union[Dict[str, Any], None]:
+    """
+    Verify a JWT token, reusing the payload of a previous verification.
+
+    Only valid tokens with an `exp` claim are cached, and only until they
+    expire. The returned payload is shared, callers must not mutate it.
+
+    Args:
+        token (str): The token to verify.
+
+    Returns:
+        Union[Dict[str, Any], None]: The decoded token if valid, None otherwise.
+    """
+
+    key = hashlib.sha256(token.encode('utf-8')).digest()
+
+    payload = _verified_tokens.get(key)
+    if payload is not None:
+        return payload
+
+    payload = verify_token(token)
+
+    if payload is not None and 'exp' in payload:
+        _verified_tokens.set(key, payload, ttl=payload['exp'] - time.time())
+
+    return payload
+
+
+def bearer_principal(authorization: Optional[str]) -> Optional[Any]:
+    """
+    Get the user id of the access token of an `Authorization` header.
+
+    Args:
+        authorization (Optional[str]): The header value.
+
+    Returns:
+        Optional[Any]: The `sub` claim, None without a valid access token.
+    """
+
+    scheme, _, token = (authorization or '').partition(' ')
+
+    if scheme.lower() != 'bearer' or not token:
+        return None
+
+    payload = verify_token_cached(token)
+
+    if payload is None or payload.get('type') != settings.JWT_ACCESS_TOKEN_TYPE:
+        return None
+
+    return payload.get('sub')
@@ -0,0 +1,146 @@
+import time
+
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+# Settings
+from config.settings import CONCURRENCY_LIMIT_ENABLED
+from config.settings import CONCURRENCY_LIMIT_INITIAL
+from config.settings import CONCURRENCY_LIMIT_MIN
+from config.settings import CONCURRENCY_LIMIT_MAX
+from config.settings import CONCURRENCY_LIMIT_BACKOFF
+from config.settings import CONCURRENCY_TARGET_LATENCY_AUTH
+from config.settings import CONCURRENCY_TARGET_LATENCY_READS
+from config.settings import CONCURRENCY_TARGET_LATENCY_WRITES
+
+# Utils
+from utils.metrics import Counter
+from utils.metrics import Gauge
+from utils.metrics import register
+
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Monitoring and debugging must keep working under load
+UNLIMITED_PATHS = ('/metrics', '/debug/')
+
+
+class AdaptiveLimit:
+    """
+    Concurrency limit adapted to the latency of the requests (AIMD).
+
+    While requests answer within the target latency and the limit is in
+    use, it grows by one every `limit` requests. Slower responses and
+    server errors shrink it by the backoff factor, at most once per target
+    latency so a burst of slow requests counts as one signal. Requests over
+    the limit are rejected instead of queueing.
+
+    Runs on the event loop only, so it needs no lock.
+    """
+
+    def __init__(self,
+                 target: float,
+                 initial: float = CONCURRENCY_LIMIT_INITIAL,
+                 minimum: float = CONCURRENCY_LIMIT_MIN,
+                 maximum: float = CONCURRENCY_LIMIT_MAX,
+                 backoff: float = CONCURRENCY_LIMIT_BACKOFF):
+        """
+        Args:
+            target (float): Latency above which the limit shrinks, in seconds.
+            initial (float): Starting limit.
+            minimum (float): Lowest limit.
+            maximum (float): Highest limit.
+            backoff (float): Factor applied to the limit when it shrinks.
+        """
+
+        self.target = target
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.in_flight = 0
+        self._decreased = 0.0
+
+    def acquire(self) -> bool:
+        """
+        Admit a request if the limit allows it.
+
+        Returns:
+            bool: True if admitted, it must then be released.
+        """
+
+        if self.in_flight >= int(self.limit):
+            return False
+
+        self.in_flight += 1
+
+        return True
+
+    def release(self, latency: float, failed: bool = False) -> None:
+        """
+        Release an admitted request and adapt the limit.
+
+        Args:
+            latency (float): Time until its response started, in seconds.
+            failed (bool): Whether it ended with a server error.
+        """
+
+        in_use = self.in_flight >= self.limit / 2
+        self.in_flight -= 1
+
+        if failed or latency > self.target:
+            now = time.monotonic()
+
+            if now - self._decreased >= self.target:
+                self.limit = max(self.minimum, self.limit * self.backoff)
+                self._decreased = now
+        elif in_use:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+
+limits: Dict[str, AdaptiveLimit] = {
+    'auth': AdaptiveLimit(CONCURRENCY_TARGET_LATENCY_AUTH / 1000),
+    'reads': AdaptiveLimit(CONCURRENCY_TARGET_LATENCY_READS / 1000),
+    'writes': AdaptiveLimit(CONCURRENCY_TARGET_LATENCY_WRITES / 1000),
+}
+
+
+def route_group(method: str, path: str) -> Optional[str]:
+    """
+    Get the limit group of a request.
+
+    Args:
+        method (str): The request method.
+        path (str): The request path.
+
+    Returns:
+        Optional[str]: `auth`, `reads` or `writes`, None for unlimited requests.
+    """
+
+    if path.startswith(UNLIMITED_PATHS):
+        return None
+
+    if path.startswith('/auth/'):
+        return 'auth'
+
+    return 'reads' if method in READ_METHODS else 'writes'
+
+
+def _limits() -> List[Tuple[Tuple[str, ...], float]]:
+    return [((group, ), limit.limit) for group, limit in limits.items()]
+
+
+def _in_flight() -> List[Tuple[Tuple[str, ...], float]]:
+    return [((group, ), limit.in_flight) for group, limit in limits.items()]
+
+
+CONCURRENCY_REJECTED = Counter(
+    'concurrency_rejected_total', 'Requests shed because their group was at its limit, by route group.',
+    ('group',))
+
+if CONCURRENCY_LIMIT_ENABLED:
+    register(Gauge('concurrency_limit', 'Current adaptive concurrency limit, by route group.', _limits, ('group',)))
+    register(Gauge('concurrency_in_flight', 'Requests being handled, by route group.', _in_flight, ('group',)))
+    register(CONCURRENCY_REJECTED)
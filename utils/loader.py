@@ -0,0 +1,362 @@
+import os
+import re
+import sys
+import json
+import time
+import itertools
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import TextIO
+from typing import Tuple
+
+# Pydantic
+from pydantic import ValidationError
+
+# SQLAlchemy
+from sqlalchemy import func
+from sqlalchemy import inspect
+from sqlalchemy import select
+from sqlalchemy.engine import Connection  # type: ignore
+from sqlalchemy.exc import IntegrityError  # type: ignore
+
+# Database
+from config.db import engine
+
+# Models
+from models import User
+from models import Tweet
+from models import Timeline
+from models import LoadProgress
+
+# Schemas
+from schemas.user import CreateUser
+from schemas.tweet import RegisterTweet
+
+# Utils
+from utils.passwords import hash_password
+from utils.search import REINDEX_TWEETS
+
+
+READ_SIZE = 1 << 16
+MAX_RECORD_SIZE = 1 << 20
+
+_SEPARATORS = re.compile(r'[\s,]*')
+
+
+def iter_json_array(file: TextIO) -> Iterator[Any]:
+    """
+    Parse the items of a JSON array one by one.
+
+    Only the current item and a read buffer are held in memory, whatever the
+    size of the file.
+
+    Args:
+        file (TextIO): File containing a JSON array.
+
+    Raises:
+        ValueError: If the file is not a JSON array or an item is malformed.
+
+    Yields:
+        Any: The next item.
+    """
+
+    decoder = json.JSONDecoder()
+    buffer = file.read(READ_SIZE).lstrip()
+
+    if not buffer.startswith('['):
+        raise ValueError('Expected a JSON array.')
+
+    position = 1
+
+    while True:
+        position = _SEPARATORS.match(buffer, position).end()
+
+        if position < len(buffer) and buffer[position] == ']':
+            return
+
+        try:
+            if position == len(buffer):
+                raise json.JSONDecodeError('Unterminated array', buffer, position)
+
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            more = file.read(READ_SIZE)
+
+            if not more or len(buffer) - position > MAX_RECORD_SIZE:
+                raise ValueError(f'Malformed JSON near: {buffer[position:position + 80]!r}')
+
+            buffer, position = buffer[position:] + more, 0
+            continue
+
+        yield item
+
+
+def iter_json_lines(file: TextIO) -> Iterator[Any]:
+    """
+    Parse a JSON Lines file, one item per line.
+
+    Args:
+        file (TextIO): File containing one JSON value per line.
+
+    Yields:
+        Any: The next item.
+    """
+
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_records(path: str) -> Iterator[Any]:
+    """
+    Stream the records of a `.json` array or a `.jsonl` / `.ndjson` file.
+
+    Args:
+        path (str): The file path.
+
+    Yields:
+        Any: The next record.
+    """
+
+    with open(path, encoding='utf-8') as file:
+        if path.endswith(('.jsonl', '.ndjson')):
+            yield from iter_json_lines(file)
+        else:
+            yield from iter_json_array(file)
+
+
+def _user_row(record: Dict[str, Any]) -> Dict[str, Any]:
+    user = CreateUser(**record).dict()
+    user['id'] = int(record['id']) if record.get('id') is not None else None
+    user['created_at'] = user['updated_at'] = datetime.utcnow()
+
+    return user
+
+
+def _tweet_row(record: Dict[str, Any]) -> Dict[str, Any]:
+    tweet = RegisterTweet(**record).dict()
+    created_at = record.get('created_at')
+    tweet['created_at'] = datetime.fromisoformat(created_at) if created_at else datetime.utcnow()
+    tweet['updated_at'] = tweet['created_at']
+
+    return tweet
+
+
+class Loader:
+    """
+    Chunked bulk loader of users and tweets.
+
+    Each chunk is committed together with the number of records of the file
+    loaded so far, so an interrupted load resumes after its last chunk.
+    """
+
+    def __init__(self,
+                 chunk_size: int = 5000,
+                 workers: Optional[int] = None,
+                 rounds: int = 12,
+                 restart: bool = False,
+                 log: TextIO = sys.stderr):
+        """
+        Args:
+            chunk_size (int): Records per transaction.
+            workers (Optional[int]): Password hashing processes, one per core by default.
+            rounds (int): bcrypt cost factor of the loaded passwords.
+            restart (bool): Ignore the saved progress and load the files from the start.
+            log (TextIO): Where progress is reported.
+        """
+
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count()
+        self.rounds = rounds
+        self.restart = restart
+        self.log = log
+
+    def load_users(self, path: str) -> Dict[str, int]:
+        """
+        Load the users of a file, hashing their passwords in a process pool.
+
+        Records are validated with `CreateUser`, an optional `id` is kept so
+        tweets can reference it.
+
+        Args:
+            path (str): The file path.
+
+        Returns:
+            Dict[str, int]: The number of loaded, skipped and invalid records.
+        """
+
+        executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+
+        def hash_passwords(users: List[Dict[str, Any]]) -> None:
+            passwords = [user['password'] for user in users]
+            hashes = executor.map(hash_password, passwords, itertools.repeat(self.rounds),
+                                  chunksize=max(1, len(users) // (self.workers * 4)))
+
+            for user, hashed in zip(users, hashes):
+                user['password'] = hashed
+
+        def insert(connection: Connection, users: List[Dict[str, Any]]) -> None:
+            connection.execute(User.insert(), users)
+
+        try:
+            return self._load(path, 'users', _user_row, insert, prepare=hash_passwords)
+        finally:
+            executor.shutdown()
+
+    def load_tweets(self, path: str) -> Dict[str, int]:
+        """
+        Load the tweets of a file.
+
+        Records are validated with `RegisterTweet`, an optional `created_at`
+        is kept. Tweets are added to the timelines of their authors and, on
+        SQLite, to the search index once the file is loaded. They are not
+        fanned out to existing followers.
+
+        Args:
+            path (str): The file path.
+
+        Returns:
+            Dict[str, int]: The number of loaded, skipped and invalid records.
+        """
+
+        def insert(connection: Connection, tweets: List[Dict[str, Any]]) -> None:
+            # Ids are assigned here so the rows can go through a cached
+            # executemany. The locking read keeps concurrent inserts past the
+            # last id waiting until the chunk is committed (SQLite allows a
+            # single writer anyway), so the ids can't be taken in between.
+            last_id = connection.execute(
+                select(func.coalesce(func.max(Tweet.c.id), 0)).with_for_update()).scalar()
+
+            for tweet_id, tweet in enumerate(tweets, last_id + 1):
+                tweet['id'] = tweet_id
+
+            connection.execute(Tweet.insert(), tweets)
+            connection.execute(Timeline.insert(), [{
+                'user_id': tweet['user_id'],
+                'tweet_id': tweet['id'],
+                'author_id': tweet['user_id'],
+                'created_at': tweet['created_at'],
+            } for tweet in tweets])
+
+        stats = self._load(path, 'tweets', _tweet_row, insert)
+
+        if engine.dialect.name == 'sqlite':
+            with engine.begin() as connection:
+                connection.execute(REINDEX_TWEETS)
+
+        return stats
+
+    def _load(self,
+              path: str,
+              kind: str,
+              to_row: Callable[[Dict[str, Any]], Dict[str, Any]],
+              insert: Callable[[Connection, List[Dict[str, Any]]], None],
+              prepare: Optional[Callable[[List[Dict[str, Any]]], None]] = None) -> Dict[str, int]:
+        if not inspect(engine).has_table(LoadProgress.name):
+            raise RuntimeError('The database schema is missing, run `python manage.py migrate` first.')
+
+        source = f'{kind}:{os.path.abspath(path)}'
+        done = self._progress(source)
+        stats = {'loaded': 0, 'skipped': done, 'invalid': 0}
+        started = time.perf_counter()
+
+        records = itertools.islice(iter_records(path), done, None)
+
+        for chunk in _chunks(records, self.chunk_size):
+            rows: List[Tuple[int, Dict[str, Any]]] = []
+
+            for number, record in enumerate(chunk, done + 1):
+                try:
+                    rows.append((number, to_row(record)))
+                except (ValidationError, ValueError, TypeError, KeyError) as e:
+                    stats['invalid'] += 1
+                    self.log.write(f'{kind} record {number} is invalid: {str(e).splitlines()[0]}\n')
+
+            done += len(chunk)
+
+            if rows and prepare is not None:
+                prepare([row for _, row in rows])
+
+            with engine.begin() as connection:
+                loaded = self._insert(connection, kind, insert, rows) if rows else 0
+                connection.execute(LoadProgress.update().where(LoadProgress.c.source == source).values(records=done))
+
+            stats['loaded'] += loaded
+            stats['invalid'] += len(rows) - loaded
+            elapsed = time.perf_counter() - started
+            self.log.write(f'{kind}: {done} records, {stats["loaded"] / elapsed:.0f}/s\n')
+
+        return stats
+
+    def _insert(self,
+                connection: Connection,
+                kind: str,
+                insert: Callable[[Connection, List[Dict[str, Any]]], None],
+                rows: List[Tuple[int, Dict[str, Any]]]) -> int:
+        """
+        Insert the rows of a chunk. If they break a constraint (a duplicate
+        email, a missing user) they are inserted one by one instead, and the
+        failing ones are rejected like invalid records, so the chunk and its
+        progress are still committed. Any other error (a deadlock, a lost
+        connection) is raised and rolls back the chunk with its progress, so
+        the next run loads it again.
+
+        Returns:
+            int: The number of inserted rows.
+        """
+
+        try:
+            with connection.begin_nested():
+                insert(connection, [row for _, row in rows])
+
+            return len(rows)
+        except IntegrityError:
+            pass
+
+        inserted = 0
+
+        for number, row in rows:
+            try:
+                with connection.begin_nested():
+                    insert(connection, [row])
+
+                inserted += 1
+            except IntegrityError as e:
+                self.log.write(f'{kind} record {number} is invalid: {str(e).splitlines()[0]}\n')
+
+        return inserted
+
+    def _progress(self, source: str) -> int:
+        with engine.begin() as connection:
+            row = connection.execute(select(LoadProgress.c.records).where(LoadProgress.c.source == source)).first()
+
+            if row is None:
+                connection.execute(LoadProgress.insert().values(source=source, records=0))
+                return 0
+
+            if self.restart:
+                connection.execute(LoadProgress.update().where(LoadProgress.c.source == source).values(records=0))
+                return 0
+
+            return row[0]
+
+
+def _chunks(records: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(records)
+
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+
+        if not chunk:
+            return
+
+        yield chunk
@@ -0,0 +1,259 @@
+import bisect
+import threading
+
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Sequence
+from typing import Tuple
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+
+    if extra:
+        pairs.append(extra)
+
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    """
+    Base of the metrics, samples are kept per combination of label values.
+
+    Updates are thread safe, the database hooks run in threadpool workers.
+    """
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        """
+        Args:
+            name (str): Metric name.
+            documentation (str): Help text.
+            labels (Sequence[str]): Label names.
+        """
+
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        """
+        Render the metric in the Prometheus text format.
+
+        Returns:
+            List[str]: The lines.
+        """
+
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(Metric):
+    """
+    Monotonic counter.
+    """
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """
+        Increment the counter of the label values.
+
+        Args:
+            *labels (str): The label values.
+            amount (float): The increment.
+        """
+
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+
+        with self._lock:
+            values = list(self._values.items())
+
+        for labels, value in values:
+            lines.append(f'{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}')
+
+        return lines
+
+
+class Histogram(Metric):
+    """
+    Histogram of observed values with fixed buckets.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Args:
+            name (str): Metric name.
+            documentation (str): Help text.
+            labels (Sequence[str]): Label names.
+            buckets (Sequence[float]): Upper bounds of the buckets, sorted.
+        """
+
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        # Per label values: count of each bucket and of +Inf, then the sum
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """
+        Record a value for the label values.
+
+        Args:
+            value (float): The observed value.
+            *labels (str): The label values.
+        """
+
+        index = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+            counts = self._values.get(labels)
+
+            if counts is None:
+                counts = self._values[labels] = [0.0] * (len(self.buckets) + 2)
+
+            counts[index] += 1
+            counts[-1] += value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+
+        with self._lock:
+            values = [(labels, list(counts)) for labels, counts in self._values.items()]
+
+        for labels, counts in values:
+            cumulative = 0.0
+
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labels, labels, le)} {_format_value(cumulative)}')
+
+            label_text = _format_labels(self.labels, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(counts[-1])}')
+            lines.append(f'{self.name}_count{label_text} {_format_value(cumulative)}')
+
+        return lines
+
+
+class Gauge(Metric):
+    """
+    Value read from a callback when the metrics are rendered.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 collect: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]],
+                 labels: Sequence[str] = ()):
+        """
+        Args:
+            name (str): Metric name.
+            documentation (str): Help text.
+            collect (Callable): Returns the label values and value of each sample.
+            labels (Sequence[str]): Label names.
+        """
+
+        super().__init__(name, documentation, labels)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = super().render()
+
+        for labels, value in self.collect():
+            lines.append(f'{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}')
+
+        return lines
+
+
+class CallbackCounter(Gauge):
+    """
+    Counter read from a callback, for counts kept by another object.
+    """
+
+    kind = 'counter'
+
+
+REGISTRY: List[Metric] = []
+
+
+def register(metric: Metric) -> Metric:
+    """
+    Add a metric to the ones rendered by `/metrics`.
+    """
+
+    REGISTRY.append(metric)
+
+    return metric
+
+
+def render() -> str:
+    """
+    Render every registered metric in the Prometheus text format.
+
+    Returns:
+        str: The exposition text.
+    """
+
+    lines: List[str] = []
+
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+
+    return '\n'.join(lines) + '\n'
+
+
+# HTTP
+HTTP_REQUESTS = register(Counter(
+    'http_requests_total', 'Requests handled, by method, route and status.', ('method', 'route', 'status')))
+HTTP_REQUEST_DURATION = register(Histogram(
+    'http_request_duration_seconds', 'Request latency until the response is sent, by method and route.',
+    ('method', 'route')))
+
+# Database
+DB_QUERY_DURATION = register(Histogram(
+    'db_query_duration_seconds', 'Latency of the statements sent to the database.'))
+DB_QUERIES = register(Counter(
+    'db_queries_total', 'Statements sent to the database, by route.', ('route',)))
+DB_QUERIES_DURATION = register(Counter(
+    'db_queries_duration_seconds_total', 'Time spent in database statements, by route.', ('route',)))
+
+# Passwords
+PASSWORD_HASHING_DURATION = register(Histogram(
+    'password_hashing_duration_seconds', 'Time to hash or check a password, queueing included, by operation.',
+    ('operation',), buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)))
+PASSWORD_HASHING_REJECTED = register(Counter(
+    'password_hashing_rejected_total', 'Hashing requests rejected because the pool was saturated.'))
+
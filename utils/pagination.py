@@ -0,0 +1,57 @@
+import json
+
+from base64 import urlsafe_b64decode
+from base64 import urlsafe_b64encode
+from datetime import datetime
+from typing import Any
+from typing import List
+
+# FastAPI
+from fastapi import HTTPException
+from fastapi import status
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Encode the keyset of the last row of a page into an opaque cursor.
+
+    Args:
+        *values (Any): The keyset values, datetimes are encoded as iso strings.
+
+    Returns:
+        str: The cursor.
+    """
+
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+
+    return urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str, *types: type) -> List[Any]:
+    """
+    Decode a cursor created by `encode_cursor`.
+
+    Args:
+        cursor (str): The cursor.
+        *types (type): The type of each keyset value (`datetime`, `int` or `str`).
+
+    Raises:
+        HTTPException: If the cursor is malformed.
+
+    Returns:
+        List[Any]: The keyset values.
+    """
+
+    try:
+        payload = json.loads(urlsafe_b64decode(cursor.encode('ascii')))
+
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError('Invalid cursor length.')
+
+        return [
+            datetime.fromisoformat(value) if kind is datetime else kind(value)
+            for kind, value in zip(types, payload)
+        ]
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail='Invalid cursor.') from e
@@ -1,18 +1,42 @@
+import os
+import time
+import asyncio
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+from typing import Callable
+from typing import Optional
+
 import bcrypt
 
+# FastAPI
+from fastapi import HTTPException
+from fastapi import status
+
+from config import settings
+
+# Utils
+from utils.metrics import PASSWORD_HASHING_DURATION
+from utils.metrics import PASSWORD_HASHING_REJECTED
 
 
-def hash_password(password: str) -> str:
+_executor: Optional[ProcessPoolExecutor] = None
+_pending = 0
+
+
+def hash_password(password: str, rounds: int = 12) -> str:
     """
     Hashes a password using bcrypt.
 
     Args:
         password (str): The password to hash.
+        rounds (int): The bcrypt cost factor.
 
     Returns:
         str: The hashed password.
     """
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
 
 
 def check_password(password, hashed):
@@ -27,3 +51,90 @@ def check_password(password, hashed):
         bool: True if the password matches the hashed password, False otherwise.
     """
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """
+    Get the process pool used for hashing, starting it on first use.
+
+    Returns:
+        ProcessPoolExecutor: The process pool.
+    """
+
+    global _executor
+
+    if _executor is None:
+        # Spawned workers don't inherit the event loop, threads or database pools of the server.
+        _executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASHING_WORKERS or os.cpu_count(),
+                                        mp_context=multiprocessing.get_context('spawn'))
+
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """
+    Stop the hashing process pool.
+    """
+
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+async def _run(operation: str, function: Callable, *args: Any) -> Any:
+    """
+    Run a hashing function in the process pool.
+
+    At most PASSWORD_HASHING_MAX_PENDING calls are admitted at once, further
+    calls fail fast instead of queueing behind a burst of logins. The time
+    of each call, queueing included, is recorded under `operation`.
+
+    Raises:
+        HTTPException: 503 if the pool is saturated.
+    """
+
+    global _pending
+
+    if _pending >= settings.PASSWORD_HASHING_MAX_PENDING:
+        PASSWORD_HASHING_REJECTED.inc()
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail='Server busy, try again later.',
+                            headers={'Retry-After': '1'})
+
+    _pending += 1
+    started = time.perf_counter()
+
+    try:
+        return await asyncio.get_running_loop().run_in_executor(get_executor(), function, *args)
+    finally:
+        _pending -= 1
+        PASSWORD_HASHING_DURATION.observe(time.perf_counter() - started, operation)
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    Hashes a password in the hashing process pool.
+
+    Args:
+        password (str): The password to hash.
+
+    Returns:
+        str: The hashed password.
+    """
+    return await _run('hash', hash_password, password)
+
+
+async def check_password_async(password: str, hashed: str) -> bool:
+    """
+    Checks a password against a hash in the hashing process pool.
+
+    Args:
+        password (str): The password to check.
+        hashed (str): The hashed password.
+
+    Returns:
+        bool: True if the password matches the hashed password, False otherwise.
+    """
+    return await _run('check', check_password, password, hashed)
@@ -0,0 +1,261 @@
+import os
+import re
+import sys
+import uuid
+import cProfile
+import secrets
+import threading
+
+from collections import Counter
+from datetime import datetime
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+# Settings
+from config.settings import DEBUG
+from config.settings import PROFILING_TOKEN
+from config.settings import PROFILING_DIRECTORY
+from config.settings import PROFILING_FORMAT
+from config.settings import PROFILING_INTERVAL
+from config.settings import PROFILING_MAX_FILES
+
+
+FORMATS = {
+    'pstats': '.prof',
+    'collapsed': '.collapsed',
+}
+
+if PROFILING_FORMAT not in FORMATS:
+    raise ValueError(f'PROFILING_FORMAT must be one of {", ".join(FORMATS)}.')
+
+PROFILE_NAME = re.compile(r'^[\w.-]+$')
+
+# A single profile runs at a time, both profilers see the whole process.
+_lock = threading.Lock()
+
+
+def is_allowed(token: Optional[str]) -> bool:
+    """
+    Check whether a request may be profiled or read the profiles.
+
+    Any request may in debug mode, others must send PROFILING_TOKEN.
+
+    Args:
+        token (Optional[str]): The `X-Profile` header of the request.
+
+    Returns:
+        bool: True if allowed.
+    """
+
+    if DEBUG:
+        return True
+
+    return bool(token and PROFILING_TOKEN and secrets.compare_digest(token, PROFILING_TOKEN))
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler recording the stacks of every thread.
+
+    A background thread samples the stacks when started, then every
+    `interval` seconds, and once more when stopped, so requests shorter
+    than the interval are still recorded. The stacks are counted in the
+    collapsed format of flamegraph.pl and speedscope: one
+    `thread;outer;...;inner count` line per stack. Threadpool workers are
+    included, so the database calls of the sync engine show up.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name='profiler', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+        self._take_sample(threading.get_ident())
+
+    @property
+    def empty(self) -> bool:
+        return not self.stacks
+
+    def dump(self, path: str) -> None:
+        with open(path, 'w') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        self._take_sample(own)
+
+        while not self._stopped.wait(self.interval):
+            self._take_sample(own)
+
+    def _take_sample(self, own: int) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+
+            stack = []
+
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})'.replace(';', ':'))
+                frame = frame.f_back
+
+            stack.append(names.get(ident, str(ident)).replace(';', ':'))
+            self.stacks[';'.join(reversed(stack))] += 1
+
+
+class DeterministicProfiler:
+    """
+    cProfile of the event loop thread, saved in the pstats format.
+
+    cProfile only instruments the thread that enables it, so the sync
+    routes and the database calls run by the threadpool are missing, only
+    the time awaiting them is recorded. Use the sampling profiler for them.
+    """
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self) -> None:
+        self.profile.enable()
+
+    def stop(self) -> None:
+        self.profile.disable()
+
+    @property
+    def empty(self) -> bool:
+        return False
+
+    def dump(self, path: str) -> None:
+        self.profile.dump_stats(path)
+
+
+class RequestProfile:
+    """
+    Profile of a single request.
+
+    Concurrent requests run on the same threads, so their work shows up in
+    the profile too.
+    """
+
+    def __init__(self, method: str, path: str):
+        slug = re.sub(r'[^\w]+', '-', path).strip('-') or 'root'
+        self.name = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{method.lower()}-{slug[:60]}-{uuid.uuid4().hex[:8]}"
+        self.name += FORMATS[PROFILING_FORMAT]
+        self.profiler: Any = (SamplingProfiler(PROFILING_INTERVAL / 1000) if PROFILING_FORMAT == 'collapsed'
+                              else DeterministicProfiler())
+
+    def start(self) -> None:
+        self.profiler.start()
+
+    def stop(self) -> None:
+        self.profiler.stop()
+
+    def save(self) -> None:
+        """
+        Write the profile to PROFILING_DIRECTORY, removing the oldest ones
+        beyond PROFILING_MAX_FILES. An empty profile is not saved, it would
+        only push a useful one out.
+        """
+
+        if self.profiler.empty:
+            return
+
+        os.makedirs(PROFILING_DIRECTORY, exist_ok=True)
+        self.profiler.dump(os.path.join(PROFILING_DIRECTORY, self.name))
+
+        for profile in list_profiles()[PROFILING_MAX_FILES:]:
+            try:
+                os.remove(os.path.join(PROFILING_DIRECTORY, profile['name']))
+            except FileNotFoundError:
+                pass
+
+
+def start_profile(method: str, path: str) -> Optional[RequestProfile]:
+    """
+    Start profiling a request, unless another one is being profiled.
+
+    Args:
+        method (str): The request method.
+        path (str): The request path.
+
+    Returns:
+        Optional[RequestProfile]: The running profile, stop it with `stop_profile`.
+    """
+
+    if not _lock.acquire(blocking=False):
+        return None
+
+    try:
+        profile = RequestProfile(method, path)
+        profile.start()
+    except BaseException:
+        _lock.release()
+        raise
+
+    return profile
+
+
+def stop_profile(profile: RequestProfile) -> None:
+    """
+    Stop a profile started by `start_profile`.
+    """
+
+    try:
+        profile.stop()
+    finally:
+        _lock.release()
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """
+    List the saved profiles, newest first.
+
+    Returns:
+        List[Dict[str, Any]]: The name, size and creation date of each profile.
+    """
+
+    try:
+        entries = [entry for entry in os.scandir(PROFILING_DIRECTORY)
+                   if entry.is_file() and entry.name.endswith(tuple(FORMATS.values()))]
+    except FileNotFoundError:
+        return []
+
+    profiles = [(entry.stat(), entry.name) for entry in entries]
+    profiles.sort(key=lambda profile: profile[0].st_mtime, reverse=True)
+
+    return [{
+        'name': name,
+        'size': stat.st_size,
+        'created_at': datetime.utcfromtimestamp(stat.st_mtime),
+    } for stat, name in profiles]
+
+
+def profile_path(name: str) -> Optional[str]:
+    """
+    Get the path of a saved profile.
+
+    Args:
+        name (str): The profile name.
+
+    Returns:
+        Optional[str]: The path, None if there is no such profile.
+    """
+
+    if not PROFILE_NAME.match(name) or not name.endswith(tuple(FORMATS.values())):
+        return None
+
+    path = os.path.join(PROFILING_DIRECTORY, name)
+
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,163 @@
+import re
+
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Sequence
+from typing import Tuple
+
+# SQLAlchemy
+from sqlalchemy import column
+from sqlalchemy import inspect
+from sqlalchemy import select
+from sqlalchemy import table
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# Database
+from config.db import Database
+
+# Models
+from models.tweet import Tweet
+from models.tweet import FULLTEXT_INDEX
+from models.tweet import CREATE_FULLTEXT_INDEX
+from models.tweet import CREATE_SEARCH_TABLE
+from models.user import User
+from models.user import USER_PUBLIC_COLUMNS
+
+# Utils
+from utils.tweets import TWEET_COLUMNS
+from utils.tweets import TWEETS_WITH_USER
+from utils.tweets import NEWEST_FIRST
+from utils.tweets import tweet_with_user
+
+
+# SQLite FTS5 table created with the tweets table or by `create_search_index`, its rowid is the tweet id
+TweetSearch = table('tweets_fts', column('rowid'), column('content'))
+
+# Index a tweet on SQLite, :id and :content
+INDEX_TWEET = text('INSERT OR REPLACE INTO tweets_fts (rowid, content) VALUES (:id, :content)')
+
+# Fill the SQLite index from the tweets table, after bulk loads
+REINDEX_TWEETS = text('INSERT OR REPLACE INTO tweets_fts (rowid, content) SELECT id, content FROM tweets')
+
+_MYSQL_MATCH = 'MATCH (tweets.content) AGAINST (:query IN NATURAL LANGUAGE MODE)'
+
+SEARCH_STATEMENTS = {
+    'mysql': (
+        TWEETS_WITH_USER
+        .where(text(_MYSQL_MATCH))
+        .order_by(text(f'{_MYSQL_MATCH} DESC'), Tweet.c.id.desc())
+    ),
+    'sqlite': (
+        select(*TWEET_COLUMNS, *USER_PUBLIC_COLUMNS)
+        .select_from(TweetSearch
+                     .join(Tweet, Tweet.c.id == TweetSearch.c.rowid)
+                     .join(User, User.c.id == Tweet.c.user_id))
+        .where(text('tweets_fts MATCH :query'))
+        .order_by(text('bm25(tweets_fts)'), Tweet.c.id.desc())
+    ),
+}
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def _sqlite_query(query: str) -> str:
+    """
+    Quote the terms of a query, so FTS5 operators typed by users are literal.
+    Any term may match, best matches rank first like MySQL natural language mode.
+    """
+
+    return ' OR '.join(f'"{term}"' for term in _TOKEN.findall(query))
+
+
+async def search_tweets(db: Database, query: str, limit: int, offset: int = 0) -> List[Dict[str, Any]]:
+    """
+    Search tweets by content, best match first.
+
+    Args:
+        db (Database): The database handle.
+        query (str): The search terms.
+        limit (int): Maximum number of tweets to return.
+        offset (int): Number of results to skip.
+
+    Returns:
+        List[Dict[str, Any]]: TweetWithRelations-shaped dicts.
+    """
+
+    statement = SEARCH_STATEMENTS.get(db.dialect_name)
+
+    if statement is None:
+        # Other databases have no full-text index, scan the table instead
+        statement = TWEETS_WITH_USER.where(Tweet.c.content.contains(query, autoescape=True)).order_by(*NEWEST_FIRST)
+    elif db.dialect_name == 'sqlite':
+        query = _sqlite_query(query)
+
+        if not query:
+            return []
+
+    rows = await db.fetch_all(statement.limit(limit).offset(offset), {'query': query})
+
+    return [tweet_with_user(row) for row in rows]
+
+
+async def index_tweet(db: Database, tweet_id: int, content: str) -> None:
+    """
+    Add or replace a tweet in the search index.
+
+    MySQL maintains its FULLTEXT index itself, only SQLite needs this.
+
+    Args:
+        db (Database): The database handle.
+        tweet_id (int): The tweet id.
+        content (str): The tweet content.
+    """
+
+    if db.dialect_name == 'sqlite':
+        await db.execute(INDEX_TWEET, {'id': tweet_id, 'content': content})
+
+
+async def index_tweets(db: Database, tweets: Sequence[Tuple[int, str]]) -> None:
+    """
+    Add or replace tweets in the search index with a single executemany.
+
+    Args:
+        db (Database): The database handle.
+        tweets (Sequence[Tuple[int, str]]): The id and content of each tweet.
+    """
+
+    if db.dialect_name == 'sqlite':
+        await db.execute(INDEX_TWEET, [{'id': tweet_id, 'content': content} for tweet_id, content in tweets])
+
+
+async def unindex_tweet(db: Database, tweet_id: int) -> None:
+    """
+    Remove a tweet from the search index.
+
+    Args:
+        db (Database): The database handle.
+        tweet_id (int): The tweet id.
+    """
+
+    if db.dialect_name == 'sqlite':
+        await db.execute(text('DELETE FROM tweets_fts WHERE rowid = :id'), {'id': tweet_id})
+
+
+def create_search_index(connection: Connection) -> None:
+    """
+    Create the full-text index if it is missing, for databases created
+    before it. A new SQLite index is filled from the tweets table.
+
+    Args:
+        connection (Connection): A connection in a transaction.
+    """
+
+    inspector = inspect(connection)
+
+    if connection.dialect.name == 'mysql':
+        if FULLTEXT_INDEX not in {index['name'] for index in inspector.get_indexes('tweets')}:
+            connection.execute(CREATE_FULLTEXT_INDEX)
+    elif connection.dialect.name == 'sqlite':
+        if not inspector.has_table('tweets_fts'):
+            connection.execute(CREATE_SEARCH_TABLE)
+            connection.execute(REINDEX_TWEETS)
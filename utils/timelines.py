@@ -0,0 +1,221 @@
+from datetime import datetime
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+# SQLAlchemy
+from sqlalchemy import and_
+from sqlalchemy import bindparam
+from sqlalchemy import func
+from sqlalchemy import literal
+from sqlalchemy import or_
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+# Database
+from config.db import Database
+
+# Settings
+from config.settings import TIMELINE_FANOUT_LIMIT
+from config.settings import TIMELINE_BACKFILL_SIZE
+
+# Models
+from models.follow import Follow
+from models.timeline import Timeline
+from models.timeline import PullAuthor
+from models.tweet import Tweet
+from models.user import User
+from models.user import USER_PUBLIC_COLUMNS
+
+# Utils
+from utils.tweets import TWEET_COLUMNS
+from utils.tweets import TWEETS_WITH_USER
+from utils.tweets import NEWEST_FIRST
+from utils.tweets import BEFORE_CURSOR
+from utils.tweets import tweet_with_user
+
+
+TIMELINE_COLUMNS = ['user_id', 'tweet_id', 'author_id', 'created_at']
+
+# Followers of :author_id, counted up to the fan-out limit only
+COUNT_FOLLOWERS = select(func.count()).select_from(
+    select(Follow.c.follower_id)
+    .where(Follow.c.followee_id == bindparam('author_id'))
+    .limit(TIMELINE_FANOUT_LIMIT + 1)
+    .subquery())
+
+IS_PULL_AUTHOR = select(PullAuthor.c.author_id).where(PullAuthor.c.author_id == bindparam('author_id'))
+
+# Timeline entries of :user_id joined to their tweets, in index order
+HOME_TIMELINE = (
+    select(*TWEET_COLUMNS, *USER_PUBLIC_COLUMNS)
+    .select_from(Timeline
+                 .join(Tweet, Tweet.c.id == Timeline.c.tweet_id)
+                 .join(User, User.c.id == Tweet.c.user_id))
+    .where(Timeline.c.user_id == bindparam('user_id'))
+    .order_by(Timeline.c.created_at.desc(), Timeline.c.tweet_id.desc())
+    .limit(bindparam('limit'))
+)
+HOME_TIMELINE_BEFORE_CURSOR = HOME_TIMELINE.where(or_(
+    Timeline.c.created_at < bindparam('created_at'),
+    and_(Timeline.c.created_at == bindparam('created_at'), Timeline.c.tweet_id < bindparam('id')),
+))
+
+# Followees of :user_id whose tweets are not fanned out
+FOLLOWED_PULL_AUTHORS = select(PullAuthor.c.author_id).join(
+    Follow, Follow.c.followee_id == PullAuthor.c.author_id).where(Follow.c.follower_id == bindparam('user_id'))
+
+PULLED_TWEETS = (
+    TWEETS_WITH_USER
+    .where(Tweet.c.user_id.in_(bindparam('author_ids', expanding=True)))
+    .order_by(*NEWEST_FIRST)
+    .limit(bindparam('limit'))
+)
+PULLED_TWEETS_BEFORE_CURSOR = PULLED_TWEETS.where(BEFORE_CURSOR)
+
+
+async def fan_out_tweet(db: Database, tweet_id: int, author_id: int, created_at: datetime) -> bool:
+    """
+    Add a new tweet to the timelines of its author and followers.
+
+    Must run in the transaction that inserts the tweet. Authors with more than
+    TIMELINE_FANOUT_LIMIT followers are only added to their own timeline, the
+    caller must then register them with `add_pull_author`.
+
+    Args:
+        db (Database): The database handle.
+        tweet_id (int): The tweet id.
+        author_id (int): The author id.
+        created_at (datetime): The tweet creation time.
+
+    Returns:
+        bool: False if the tweet was not fanned out to the followers.
+    """
+
+    return await fan_out_tweets(db, author_id, [(tweet_id, created_at)])
+
+
+async def fan_out_tweets(db: Database, author_id: int, tweets: Sequence[Tuple[int, datetime]]) -> bool:
+    """
+    Add new tweets of the same author to the timelines of the author and followers.
+
+    Same as `fan_out_tweet`, with one statement per step whatever the number
+    of tweets.
+
+    Args:
+        db (Database): The database handle.
+        author_id (int): The author id.
+        tweets (Sequence[Tuple[int, datetime]]): The id and creation time of each tweet.
+
+    Returns:
+        bool: False if the tweets were not fanned out to the followers.
+    """
+
+    await db.execute(Timeline.insert().values([
+        {'user_id': author_id, 'tweet_id': tweet_id, 'author_id': author_id, 'created_at': created_at}
+        for tweet_id, created_at in tweets
+    ]))
+
+    followers = (await db.fetch_one(COUNT_FOLLOWERS, {'author_id': author_id}))[0]
+
+    if followers > TIMELINE_FANOUT_LIMIT:
+        return False
+
+    if followers:
+        await db.execute(Timeline.insert().from_select(TIMELINE_COLUMNS, select(
+            Follow.c.follower_id,
+            Tweet.c.id,
+            Tweet.c.user_id,
+            Tweet.c.created_at,
+        ).select_from(Follow.join(Tweet, Tweet.c.user_id == Follow.c.followee_id)).where(
+            Follow.c.followee_id == author_id,
+            Tweet.c.id.in_([tweet_id for tweet_id, _ in tweets]),
+        )))
+
+    return True
+
+
+async def add_pull_author(db: Database, author_id: int) -> None:
+    """
+    Merge the tweets of an author into the timelines of their followers on read.
+
+    Args:
+        db (Database): The database handle.
+        author_id (int): The author id.
+    """
+
+    if await db.fetch_one(IS_PULL_AUTHOR, {'author_id': author_id}) is not None:
+        return
+
+    try:
+        async with db.transaction():
+            await db.execute(PullAuthor.insert().values(author_id=author_id))
+    except IntegrityError:
+        # Registered by a concurrent request
+        pass
+
+
+async def backfill_timeline(db: Database, user_id: int, author_id: int) -> None:
+    """
+    Copy the latest tweets of a newly followed author into a timeline.
+
+    Args:
+        db (Database): The database handle.
+        user_id (int): The follower id.
+        author_id (int): The followed author id.
+    """
+
+    if await db.fetch_one(IS_PULL_AUTHOR, {'author_id': author_id}) is not None:
+        return
+
+    await db.execute(Timeline.insert().from_select(TIMELINE_COLUMNS, select(
+        literal(user_id),
+        Tweet.c.id,
+        Tweet.c.user_id,
+        Tweet.c.created_at,
+    ).where(Tweet.c.user_id == author_id).order_by(*NEWEST_FIRST).limit(TIMELINE_BACKFILL_SIZE)))
+
+
+async def read_timeline(db: Database,
+                        user_id: int,
+                        limit: int,
+                        cursor: Optional[Tuple[datetime, int]] = None) -> List[Dict[str, Any]]:
+    """
+    Read a page of a home timeline, newest first.
+
+    Materialized entries are a single range scan of the timeline index. The
+    tweets of followed pull authors are read from the tweets table and merged.
+
+    Args:
+        db (Database): The database handle.
+        user_id (int): The timeline owner.
+        limit (int): Maximum number of tweets to return.
+        cursor (Optional[Tuple[datetime, int]]): Keyset of the last tweet of the previous page.
+
+    Returns:
+        List[Dict[str, Any]]: Up to `limit` TweetWithRelations-shaped dicts.
+    """
+
+    parameters: Dict[str, Any] = {'user_id': user_id, 'limit': limit}
+
+    if cursor is not None:
+        parameters['created_at'], parameters['id'] = cursor
+
+    rows = await db.fetch_all(HOME_TIMELINE if cursor is None else HOME_TIMELINE_BEFORE_CURSOR, parameters)
+    tweets = {row[0]: tweet_with_user(row) for row in rows}
+
+    author_ids = [row[0] for row in await db.fetch_all(FOLLOWED_PULL_AUTHORS, {'user_id': user_id})]
+
+    if author_ids:
+        rows = await db.fetch_all(PULLED_TWEETS if cursor is None else PULLED_TWEETS_BEFORE_CURSOR,
+                                  {**parameters, 'author_ids': author_ids})
+
+        for row in rows:
+            tweets.setdefault(row[0], tweet_with_user(row))
+
+        return sorted(tweets.values(), key=lambda tweet: (tweet['created_at'], tweet['id']), reverse=True)[:limit]
+
+    return list(tweets.values())
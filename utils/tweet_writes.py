@@ -0,0 +1,191 @@
+import asyncio
+
+from collections import defaultdict
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+# FastAPI
+from fastapi import HTTPException
+from fastapi import status
+
+# SQLAlchemy
+from sqlalchemy import text
+
+# Database
+from config.db import Database
+from config.db import database
+
+# Settings
+from config.settings import TWEETS_GROUP_COMMIT_MAX_BATCH
+from config.settings import TWEETS_GROUP_COMMIT_MAX_DELAY
+
+# Models
+from models.tweet import Tweet
+
+# Utils
+from utils.tweets import inserted_ids
+from utils.timelines import fan_out_tweets
+from utils.timelines import add_pull_author
+from utils.search import index_tweets
+
+
+# Whether a multi-row INSERT gets consecutive ids, checked once per process
+_consecutive_ids: Optional[bool] = None
+
+
+async def has_consecutive_ids(db: Database) -> bool:
+    """
+    Check whether the ids of a multi-row INSERT can be derived with `inserted_ids`.
+
+    Args:
+        db (Database): The database handle.
+
+    Returns:
+        bool: False on MySQL with interleaved auto-increment locks.
+    """
+
+    global _consecutive_ids
+
+    if db.dialect_name != 'mysql':
+        return True
+
+    if _consecutive_ids is None:
+        row = await db.fetch_one(text('SELECT @@innodb_autoinc_lock_mode'))
+        _consecutive_ids = row is None or int(row[0]) != 2
+
+    return _consecutive_ids
+
+
+async def insert_tweets(db: Database, tweets: List[Dict[str, Any]]) -> List[int]:
+    """
+    Insert tweets with a single multi-row INSERT, index and fan them out.
+
+    Must run in a transaction. The tweets may belong to different authors,
+    each one is fanned out once for all of their tweets.
+
+    Args:
+        db (Database): The database handle.
+        tweets (List[Dict[str, Any]]): The tweet rows, their `id` is set in place.
+
+    Returns:
+        List[int]: The authors whose tweets were not fanned out, the caller
+            must register them with `add_pull_author` once committed.
+    """
+
+    if await has_consecutive_ids(db):
+        response = await db.execute(Tweet.insert().values(tweets))
+
+        if response is None or (response.rowcount != len(tweets)):
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                                detail='Something went wrong.')
+
+        ids = inserted_ids(db.dialect_name, response.lastrowid, len(tweets))
+    else:
+        ids = [(await db.execute(Tweet.insert().values(tweet))).lastrowid for tweet in tweets]
+
+    by_author: Dict[int, List[Tuple[int, Any]]] = defaultdict(list)
+
+    for tweet, tweet_id in zip(tweets, ids):
+        tweet['id'] = tweet_id
+        by_author[tweet['user_id']].append((tweet_id, tweet['created_at']))
+
+    await index_tweets(db, [(tweet['id'], tweet['content']) for tweet in tweets])
+
+    return [author_id for author_id, author_tweets in by_author.items()
+            if not await fan_out_tweets(db, author_id, author_tweets)]
+
+
+class TweetWriteBuffer:
+    """
+    Group commit of the tweets created by concurrent requests.
+
+    Tweets are queued for up to `max_delay` milliseconds, or until
+    `max_batch` are waiting, then written by `insert_tweets` in a single
+    transaction on a connection of its own. One batch is written at a time,
+    the next one fills up meanwhile.
+    """
+
+    def __init__(self, max_batch: int, max_delay: float):
+        """
+        Args:
+            max_batch (int): Maximum number of tweets per transaction.
+            max_delay (float): Maximum time a tweet waits for its batch, in milliseconds.
+        """
+
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending: List[Tuple[Dict[str, Any], 'asyncio.Future[int]']] = []
+        self._full: Optional[asyncio.Event] = None
+        self._writer: Optional['asyncio.Task[None]'] = None
+
+    async def insert(self, tweet: Dict[str, Any]) -> int:
+        """
+        Queue a tweet and wait until its batch is committed.
+
+        Args:
+            tweet (Dict[str, Any]): The tweet row.
+
+        Raises:
+            Exception: The error of the batch, if it failed.
+
+        Returns:
+            int: The tweet id.
+        """
+
+        future: 'asyncio.Future[int]' = asyncio.get_running_loop().create_future()
+        self._pending.append((tweet, future))
+
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.ensure_future(self._write())
+        elif self._full is not None and len(self._pending) >= self.max_batch:
+            self._full.set()
+
+        # A cancelled request cancels the future only, the tweet is still written
+        return await future
+
+    async def close(self) -> None:
+        """
+        Wait until the queued tweets are written.
+        """
+
+        if self._writer is not None:
+            await self._writer
+
+    async def _write(self) -> None:
+        while self._pending:
+            if len(self._pending) < self.max_batch:
+                self._full = asyncio.Event()
+
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_delay / 1000)
+                except asyncio.TimeoutError:
+                    pass
+
+                self._full = None
+
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            await self._commit(batch)
+
+    async def _commit(self, batch: List[Tuple[Dict[str, Any], 'asyncio.Future[int]']]) -> None:
+        try:
+            async with database() as db:
+                async with db.transaction():
+                    pull_authors = await insert_tweets(db, [tweet for tweet, _ in batch])
+
+                for author_id in pull_authors:
+                    await add_pull_author(db, author_id)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for tweet, future in batch:
+            if not future.done():
+                future.set_result(tweet['id'])
+
+
+tweet_writes = TweetWriteBuffer(TWEETS_GROUP_COMMIT_MAX_BATCH, TWEETS_GROUP_COMMIT_MAX_DELAY)
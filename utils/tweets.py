@@ -0,0 +1,119 @@
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Sequence
+
+# SQLAlchemy
+from sqlalchemy import and_
+from sqlalchemy import bindparam
+from sqlalchemy import or_
+from sqlalchemy import select
+
+# Models
+from models.tweet import Tweet
+from models.user import User
+from models.user import USER_PUBLIC_COLUMNS
+
+
+TWEET_COLUMNS = (
+    Tweet.c.id,
+    Tweet.c.content,
+    Tweet.c.created_at,
+    Tweet.c.updated_at,
+)
+
+# Tweets joined to their author. Statements derived from it are built once at
+# import time, so SQLAlchemy compiles each of them once and reuses the cached
+# SQL on every request.
+TWEETS_WITH_USER = select(*TWEET_COLUMNS, *USER_PUBLIC_COLUMNS).select_from(
+    Tweet.join(User, Tweet.c.user_id == User.c.id))
+
+# Tweets of :user_id without their author, matching the tweets(user_id, created_at, id) index.
+USER_TWEETS = select(*TWEET_COLUMNS, Tweet.c.user_id).where(Tweet.c.user_id == bindparam('user_id'))
+
+# Newest first, matching the tweets(created_at, id) index.
+NEWEST_FIRST = (Tweet.c.created_at.desc(), Tweet.c.id.desc())
+
+# Keyset of the tweets older than the :created_at / :id cursor.
+BEFORE_CURSOR = or_(
+    Tweet.c.created_at < bindparam('created_at'),
+    and_(Tweet.c.created_at == bindparam('created_at'), Tweet.c.id < bindparam('id')),
+)
+
+# Plain str keys, column names are `quoted_name` which orjson rejects
+_TWEET_KEYS = tuple(str(column.name) for column in TWEET_COLUMNS)
+_USER_KEYS = tuple(str(column.name) for column in USER_PUBLIC_COLUMNS)
+_USER_OFFSET = len(_TWEET_KEYS)
+_USER_TWEET_KEYS = _TWEET_KEYS + ('user_id',)
+
+
+def tweet_with_user(row: Sequence[Any]) -> Dict[str, Any]:
+    """
+    Map a `TWEETS_WITH_USER` row to a TweetWithRelations-shaped dict.
+
+    Values are read by position, so no key is parsed per row.
+
+    Args:
+        row (Sequence[Any]): The row.
+
+    Returns:
+        Dict[str, Any]: The tweet with its nested user.
+    """
+
+    tweet = dict(zip(_TWEET_KEYS, row))
+    tweet['user'] = dict(zip(_USER_KEYS, row[_USER_OFFSET:]))
+
+    return tweet
+
+
+def user_tweet(row: Sequence[Any]) -> Dict[str, Any]:
+    """
+    Map a `USER_TWEETS` row to a Tweet-shaped dict.
+
+    Args:
+        row (Sequence[Any]): The row.
+
+    Returns:
+        Dict[str, Any]: The tweet.
+    """
+
+    return dict(zip(_USER_TWEET_KEYS, row))
+
+
+def user_out(row: Sequence[Any]) -> Dict[str, Any]:
+    """
+    Map a row of `USER_PUBLIC_COLUMNS` to a UserOut-shaped dict.
+
+    Args:
+        row (Sequence[Any]): The row.
+
+    Returns:
+        Dict[str, Any]: The user.
+    """
+
+    return dict(zip(_USER_KEYS, row))
+
+
+def inserted_ids(dialect_name: str, lastrowid: int, count: int) -> List[int]:
+    """
+    Ids of the rows created by a single multi-row INSERT.
+
+    Assumes the rows of one statement got consecutive ids. SQLite has a
+    single writer, InnoDB reserves them at once for inserts with a known row
+    count unless `innodb_autoinc_lock_mode` is 2 (interleaved, the MySQL 8
+    default), where concurrent inserts may interleave their ids; callers
+    must insert row by row then. MySQL reports the first id as `lastrowid`,
+    SQLite the last.
+
+    Args:
+        dialect_name (str): The database dialect.
+        lastrowid (int): The `lastrowid` of the insert.
+        count (int): Number of inserted rows.
+
+    Returns:
+        List[int]: The ids, in the order of the inserted values.
+    """
+
+    first = lastrowid if dialect_name == 'mysql' else lastrowid - count + 1
+
+    return list(range(first, first + count))